@@ -2,13 +2,18 @@ import os
 import logging
 import random
 import asyncio
+import weakref
+from collections import defaultdict
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
-from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton, InlineQueryResultArticle, InputTextMessageContent
+from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton, InlineQueryResultArticle, InputTextMessageContent, InputMediaPhoto
+from telegram.error import BadRequest, Forbidden, RetryAfter
+from telegram.request import HTTPXRequest
 from telegram.ext import Application, CommandHandler, ContextTypes, MessageHandler, filters, CallbackQueryHandler, InlineQueryHandler
-from database import Database
+from database import Database, rating_stars
 from sqlalchemy.exc import SQLAlchemyError
-from scraper import get_product_details, is_valid_amazon_url
+from scraper import get_product_details, is_valid_amazon_url, resolve_url, close_client, close_parse_pool
+from sender import TelegramSender
 from aiohttp import web
 
 # Load environment variables
@@ -24,118 +29,178 @@ logger = logging.getLogger(__name__)
 # Initialize database
 db = Database()
 
-# Store admin user IDs
-ADMIN_IDS = [int(id.strip()) for id in os.getenv('ADMIN_IDS', '').split(',') if id.strip()]
+# Rate-limited queue for messages the bot sends on its own (not replies)
+sender = TelegramSender()
 
-# Dictionary to store products (will be loaded from MongoDB)
+# Store admin user IDs (list keeps .env order; frozenset for O(1) checks)
+_ADMIN_ID_LIST = [int(id.strip()) for id in os.getenv('ADMIN_IDS', '').split(',') if id.strip()]
+ADMIN_IDS = frozenset(_ADMIN_ID_LIST)
+
+# Dictionary to store products (will be loaded from MongoDB), keyed by
+# lowercased category name
 PRODUCTS = {}
 
+# Lowercased category name -> name as stored in MongoDB and shown to users
+DISPLAY_NAMES = {}
+
+# Every product across categories, kept in sync with PRODUCTS for random picks
+ALL_PRODUCTS = []
+
+# Lowercased title -> (category, product), for inline "deal_<title>" lookups
+TITLE_INDEX = {}
+
+# Category names from MongoDB; None until read or after a category change
+_CATEGORIES_CACHE = None
+
+# Bumped by every in-place catalogue edit, so a reload that read MongoDB
+# while a handler was editing knows its snapshot is stale
+_CATALOGUE_GENERATION = 0
+
+# Reads a reload makes when handlers keep editing before it gives up
+CATALOGUE_READ_ATTEMPTS = 3
+
 # Get environment variables
 PORT = int(os.getenv('PORT', 8080))
 ENVIRONMENT = os.getenv('ENVIRONMENT', 'development').lower()
 WEBHOOK_URL = os.getenv('WEBHOOK_URL', '')
 
-def load_products_from_db():
-    """Load products from MongoDB into memory."""
-    global PRODUCTS
-    try:
-        # Get all categories first
-        categories = db.get_all_categories()
-        
-        # Initialize PRODUCTS with empty lists for all categories
-        PRODUCTS = {category: [] for category in categories}
-        
-        # Get all products from database
-        all_products = db.get_all_products()
-        
-        # Organize products by category
-        for product in all_products:
-            category = product['category']
+# Connections kept open to the Bot API, and the most webhook connections
+# Telegram may open to us in parallel
+TELEGRAM_POOL_SIZE = 64
+WEBHOOK_MAX_CONNECTIONS = 100
+
+# Seconds an idle HTTP connection to the web server stays open
+WEB_KEEPALIVE_TIMEOUT = 75
+
+# Status reports go to PING_CHAT_ID, falling back to the first admin
+PING_CHAT_ID = int(os.getenv('PING_CHAT_ID') or (_ADMIN_ID_LIST[0] if _ADMIN_ID_LIST else 0))
+
+def _category_key(name):
+    """Normalise a category name to its PRODUCTS key."""
+    return name.strip().lower()
+
+def _display_name(key):
+    """Shown (and stored) name for a category key; new ones are capitalized."""
+    return DISPLAY_NAMES.get(key) or key.capitalize()
+
+def _title_key(title):
+    """Normalise a title (or deal_ query) to its TITLE_INDEX key."""
+    return title.strip().lower()
+
+def _index_title(index, category, product):
+    """Add product to a title index, keeping the first product for a title."""
+    if product.get('title'):
+        index.setdefault(_title_key(product['title']), (category, product))
+
+def _unindex_titles(products):
+    """Drop removed products from TITLE_INDEX, promoting the next with the same title.
+
+    Call after the products are gone from ALL_PRODUCTS.
+    """
+    dropped = set()
+    for product in products:
+        key = _title_key(product.get('title', ''))
+        entry = TITLE_INDEX.get(key)
+        if entry and entry[1] is product:
+            del TITLE_INDEX[key]
+            dropped.add(key)
+    if dropped:
+        # One pass re-indexes the first remaining product per title, as a reload would
+        for product in ALL_PRODUCTS:
+            if _title_key(product.get('title', '')) in dropped:
+                _index_title(TITLE_INDEX, product['category'], product)
+
+def _fetch_catalogue():
+    """Read products from MongoDB and build the catalogue and its indexes.
+
+    Touches no module state, so it is safe to run in a worker thread.
+    Returns None if MongoDB couldn't be read.
+    """
+    # Categories and their products in a single round trip
+    products = db.get_products_grouped()
+    if products is None:
+        return None
+    
+    # Flat list and title index are built in the same pass
+    catalogue = {}
+    display_names = {}
+    all_products = []
+    title_index = {}
+    for category, items in products.items():
+        key = _category_key(category)
+        display_names.setdefault(key, category)
+        catalogue.setdefault(key, []).extend(items)
+        for product in items:
             # Convert MongoDB _id to string for JSON serialization
             product['_id'] = str(product['_id'])
-            if category in PRODUCTS:
-                PRODUCTS[category].append(product)
-            else:
-                # If category doesn't exist (shouldn't happen), create it
-                PRODUCTS[category] = [product]
+            # Category is fixed here so handlers can treat products as read-only
+            product['category'] = category
+            # Documents stored before rating_stars existed
+            if 'rating_stars' not in product:
+                product['rating_stars'] = rating_stars(product.get('rating'))
+            all_products.append(product)
+            _index_title(title_index, category, product)
+    return catalogue, display_names, all_products, title_index
+
+def _catalogue_changed():
+    """Record an in-place edit to PRODUCTS / ALL_PRODUCTS."""
+    global _CATALOGUE_GENERATION
+    _CATALOGUE_GENERATION += 1
+
+async def load_products_from_db():
+    """Load products from MongoDB into memory."""
+    global PRODUCTS, DISPLAY_NAMES, ALL_PRODUCTS, TITLE_INDEX, _CATEGORIES_CACHE
+    try:
+        # The read runs in a worker thread; the swap below happens back on the
+        # event loop, so handlers never see a half-built catalogue. A handler
+        # edit during the read could predate the snapshot, so read again.
+        for _ in range(CATALOGUE_READ_ATTEMPTS):
+            generation = _CATALOGUE_GENERATION
+            catalogue = await asyncio.to_thread(_fetch_catalogue)
+            if catalogue is None:
+                # Don't clear PRODUCTS on error
+                return
+            if generation == _CATALOGUE_GENERATION:
+                break
+            logger.info("Catalogue edited during reload, reading it again")
+        else:
+            logger.warning("Catalogue kept changing during reload; keeping the in-memory copy")
+            return
+        products, display_names, all_products, title_index = catalogue
         
-        logger.info(f"Loaded {len(all_products)} products across {len(categories)} categories")
+        previous = {product['_id']: product for product in ALL_PRODUCTS}
+        PRODUCTS, DISPLAY_NAMES = products, display_names
+        ALL_PRODUCTS, TITLE_INDEX = all_products, title_index
+        # The aggregation already returned every category, sorted by name
+        _CATEGORIES_CACHE = list(display_names.values())
+        _prune_render_caches(previous, all_products)
+        _invalidate_header_keyboard()
+        logger.info(f"Loaded {len(all_products)} products across {len(products)} categories")
     except Exception as e:
         logger.error(f"Error loading products from database: {e}")
         # Don't clear PRODUCTS on error
         return
 
+def get_categories_cached():
+    """Return category names, querying MongoDB only when the cache is empty."""
+    global _CATEGORIES_CACHE
+    if _CATEGORIES_CACHE is None:
+        categories = db.get_all_categories()
+        if not categories:
+            # Empty on errors too, so don't cache it
+            return categories
+        _CATEGORIES_CACHE = categories
+    return _CATEGORIES_CACHE
+
+def _invalidate_categories_cache():
+    """Re-read category names from MongoDB on next use."""
+    global _CATEGORIES_CACHE
+    _CATEGORIES_CACHE = None
+
 def is_admin(user_id):
     """Check if user is an admin."""
     return user_id in ADMIN_IDS
 
-# Predefined products with affiliate links
-PRODUCTS = {
-    'Electronics': [
-        {
-            'title': 'boAt Airdopes 141 Bluetooth TWS Earbuds',
-            'price': '₹1,299',
-            'original_price': '₹4,499',
-            'discount': '71%',
-            'rating': '4.1',
-            'reviews': '12,543',
-            'description': '42H playtime, ENx™ Technology, ASAP™ Charge, IWP™ Technology, 8mm drivers',
-            'features': [
-                'Up to 42 Hours Total Playback',
-                'ENx™ Technology for Clear Calls',
-                'ASAP™ Charge - 10 mins = 75 mins',
-                'IPX4 Water Resistance'
-            ],
-            'image_url': 'https://m.media-amazon.com/images/I/61KNJav3S9L._SX522_.jpg',
-            'link': 'https://amzn.to/yourlink1'  # Replace with your actual affiliate link
-        },
-        {
-            'title': 'OnePlus Nord Buds 2',
-            'price': '₹2,999',
-            'original_price': '₹3,999',
-            'discount': '25%',
-            'rating': '4.2',
-            'reviews': '8,876',
-            'description': 'Active Noise Cancellation, Spatial Audio, 12.4mm drivers, Up to 36hrs battery',
-            'features': [
-                'Up to 36 Hours Battery Life',
-                'Active Noise Cancellation up to 25db',
-                'IP55 Dust and Water Resistance',
-                'Super Fast Charging'
-            ],
-            'image_url': 'https://m.media-amazon.com/images/I/51oxrEYhYQL._SL1500_.jpg',
-            'link': 'https://amzn.to/yourlink2'  # Replace with your actual affiliate link
-        }
-    ],
-    'Fashion': [
-        {
-            'title': 'Allen Solly Men Regular Fit Shirt',
-            'price': '₹799',
-            'original_price': '₹1,599',
-            'discount': '50%',
-            'rating': '4.0',
-            'reviews': '2,345',
-            'description': 'Regular Fit Cotton Shirt, Perfect for Office Wear',
-            'features': [
-                '100% Premium Cotton',
-                'Regular Collar',
-                'Machine Wash',
-                'Perfect for Formal & Casual Wear'
-            ],
-            'image_url': 'https://m.media-amazon.com/images/I/61N6Ls3K8iL._UY679_.jpg',
-            'link': 'https://amzn.to/yourlink3'  # Replace with your actual affiliate link
-        }
-    ],
-    'Home': [
-        {
-            'title': 'Wipro Smart LED Bulb',
-            'price': '₹499',
-            'rating': '4.3',
-            'link': f'https://www.amazon.in/dp/B07PYJJ898?tag=krunalweb20-21'
-        }
-    ]
-}
-
 WELCOME_MESSAGE = """🎉 Welcome to Amazon Deals Bot! 🛍️
 
 I'm here to help you discover amazing deals on Amazon products! 
@@ -169,6 +234,7 @@ ADMIN_HELP = """🔐 Admin Commands:
 /list - List all products with their IDs
 /category_add [category] - Add new category
 /category_remove [category] - Remove category
+/broadcast [message] - Send a message to every user
 
 Example:
 /link https://www.amazon.in/dp/XXXXX"""
@@ -192,6 +258,36 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     else:
         await update.message.reply_text(HELP_MESSAGE)
 
+# Seconds to collect /link previews in a chat before sending them together
+BATCH_WINDOW = 5
+
+# Products added per chat that are waiting for the next preview flush
+_PENDING_ADDS = defaultdict(list)
+_FLUSH_TASKS = {}
+
+def _queue_preview(message_obj, product):
+    """Buffer a product preview, starting the chat's flush task if needed."""
+    chat_id = message_obj.chat_id
+    _PENDING_ADDS[chat_id].append(product)
+    if chat_id not in _FLUSH_TASKS:
+        _FLUSH_TASKS[chat_id] = asyncio.create_task(_flush_previews(message_obj, chat_id))
+
+async def _flush_previews(message_obj, chat_id):
+    """Send buffered previews one media group per window until none are left."""
+    try:
+        while _PENDING_ADDS.get(chat_id):
+            await asyncio.sleep(BATCH_WINDOW)
+            # Anything past one album spills into the next window
+            pending = _PENDING_ADDS[chat_id]
+            batch, _PENDING_ADDS[chat_id] = pending[:MEDIA_GROUP_SIZE], pending[MEDIA_GROUP_SIZE:]
+            try:
+                await _reply_products(message_obj, batch)
+            except Exception as e:
+                logger.error(f"Error sending product previews: {e}")
+    finally:
+        _PENDING_ADDS.pop(chat_id, None)
+        _FLUSH_TASKS.pop(chat_id, None)
+
 async def add_product(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Add product from Amazon URL."""
     if not is_admin(update.effective_user.id):
@@ -203,14 +299,16 @@ async def add_product(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     url = context.args[0]
-    if not is_valid_amazon_url(url):
+    # Expand a short link once; validation and scraping both reuse it
+    expanded = await resolve_url(url)
+    if not await is_valid_amazon_url(url, expanded=expanded):
         await update.message.reply_text("❌ Invalid Amazon URL. Please provide a valid Amazon product URL.")
         return
 
     status_message = await update.message.reply_text("🔄 Fetching product details...")
     
     try:
-        product_data = get_product_details(url)
+        product_data = await get_product_details(url, expanded=expanded)
         if not product_data:
             await status_message.edit_text("❌ Failed to fetch product details. This could be because:\n"
                                         "1. The product page is not accessible\n"
@@ -221,10 +319,11 @@ async def add_product(update: Update, context: ContextTypes.DEFAULT_TYPE):
         
         # Determine category
         if len(context.args) > 1:
-            category = context.args[1].capitalize()
+            key = _category_key(context.args[1])
+            category = _display_name(key)
         else:
             # Ask for category
-            categories = db.get_all_categories() or ['Electronics', 'Fashion', 'Home']
+            categories = get_categories_cached() or ['Electronics', 'Fashion', 'Home']
             category_list = "\n".join([f"🔹 {cat}" for cat in categories])
             await status_message.edit_text(
                 f"Please specify a category for this product:\n\n{category_list}\n\n"
@@ -233,35 +332,24 @@ async def add_product(update: Update, context: ContextTypes.DEFAULT_TYPE):
             return
 
         # Add product to database
-        product_id = db.add_product(product_data, category)
-        if not product_id:
+        product_data = db.add_product(product_data, category)
+        if not product_data:
             await status_message.edit_text("❌ Failed to add product to database. Please try again.")
             return
 
-        # Reload products from database
-        load_products_from_db()
-
-        # Send preview
-        try:
-            message, keyboard = format_product_message(product_data)
-            if 'image_url' in product_data:
-                await update.message.reply_photo(
-                    photo=product_data['image_url'],
-                    caption=message,
-                    parse_mode='HTML',
-                    reply_markup=keyboard
-                )
-            else:
-                await update.message.reply_text(
-                    text=message,
-                    parse_mode='HTML',
-                    reply_markup=keyboard
-                )
-            await status_message.edit_text(f"✅ Product added to {category} category!")
-        except Exception as e:
-            logger.error(f"Error sending product message: {e}")
-            await status_message.edit_text("✅ Product added, but there was an error displaying it. "
-                                         "The product has been saved and will appear in deals.")
+        # Update the in-memory catalogue instead of reloading everything
+        _catalogue_changed()
+        if key not in PRODUCTS:
+            DISPLAY_NAMES[key] = category
+            _invalidate_header_keyboard()
+            _invalidate_categories_cache()
+        PRODUCTS.setdefault(key, []).append(product_data)
+        ALL_PRODUCTS.append(product_data)
+        _index_title(TITLE_INDEX, category, product_data)
+
+        # Previews from links added in quick succession go out together
+        _queue_preview(update.message, product_data)
+        await status_message.edit_text(f"✅ Product added to {category} category! Preview follows shortly.")
             
     except Exception as e:
         logger.error(f"Error in add_product: {e}")
@@ -277,14 +365,13 @@ async def list_products(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("No products available.")
         return
 
-    message = "📦 Product List:\n\n"
-    for category, products in PRODUCTS.items():
-        message += f"📂 {category}:\n"
-        for i, product in enumerate(products):
-            message += f"{i+1}. {product['title'][:50]}...\n"
-        message += "\n"
+    lines = ["📦 Product List:", ""]
+    for key, products in PRODUCTS.items():
+        lines.append(f"📂 {DISPLAY_NAMES[key]}:")
+        lines.extend(f"{i+1}. {product['title'][:50]}..." for i, product in enumerate(products))
+        lines.append("")
 
-    await update.message.reply_text(message)
+    await update.message.reply_text("\n".join(lines))
 
 async def remove_product(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Remove a product."""
@@ -296,14 +383,18 @@ async def remove_product(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("❌ Please provide category and product number.\nExample: /remove Electronics 1")
         return
 
-    category = context.args[0].capitalize()
+    key = _category_key(context.args[0])
     try:
         index = int(context.args[1]) - 1
-        if category in PRODUCTS and 0 <= index < len(PRODUCTS[category]):
-            product = PRODUCTS[category][index]
+        if key in PRODUCTS and 0 <= index < len(PRODUCTS[key]):
+            product = PRODUCTS[key][index]
             if db.remove_product(product['_id']):
-                # Reload products from database
-                load_products_from_db()
+                # Update the in-memory catalogue instead of reloading everything
+                _catalogue_changed()
+                ALL_PRODUCTS.remove(PRODUCTS[key].pop(index))
+                _unindex_titles([product])
+                _FMT_CACHE.pop(product['_id'], None)
+                _INLINE_KB_CACHE.pop(product['_id'], None)
                 await update.message.reply_text(f"✅ Removed: {product['title']}")
             else:
                 await update.message.reply_text("❌ Failed to remove product from database.")
@@ -312,161 +403,337 @@ async def remove_product(update: Update, context: ContextTypes.DEFAULT_TYPE):
     except ValueError:
         await update.message.reply_text("❌ Invalid product number.")
 
+# Rendered (message, keyboard) per product _id. Entries outlive reloads and
+# are only dropped when their product is removed or changes in MongoDB.
+_FMT_CACHE = {}
+
+def _prune_render_caches(previous, products):
+    """Drop cached renders of products that were removed or changed since the last load."""
+    current = {product['_id']: product for product in products}
+    for cache in (_FMT_CACHE, _INLINE_KB_CACHE):
+        for product_id in list(cache):
+            product = current.get(product_id)
+            if product is None or product != previous.get(product_id):
+                del cache[product_id]
+
 def format_product_message(product_data):
+    """Format product data into a message, reusing the cached render per product."""
+    product_id = product_data.get('_id') if product_data else None
+    if product_id in _FMT_CACHE:
+        return _FMT_CACHE[product_id]
+    rendered = _render_product_message(product_data)
+    if product_id:
+        _FMT_CACHE[product_id] = rendered
+    return rendered
+
+async def _reply_product_photo(message_obj, product, **kwargs):
+    """Reply with the product photo, reusing Telegram's file_id after the first upload."""
+    file_id = product.get('photo_file_id')
+    if file_id:
+        try:
+            return await message_obj.reply_photo(photo=file_id, **kwargs)
+        except BadRequest as e:
+            if 'file' not in str(e).lower():
+                raise
+            # Telegram no longer accepts this file_id; upload from the URL again
+            logger.warning(f"Cached photo rejected for {product.get('title')}: {e}")
+            await _remember_photo_file_id(product, None)
+
+    sent = await message_obj.reply_photo(photo=product['image_url'], **kwargs)
+    if sent.photo:
+        await _remember_photo_file_id(product, sent.photo[-1].file_id)
+    return sent
+
+# Telegram accepts at most 10 photos per media group
+MEDIA_GROUP_SIZE = 10
+
+def _album_caption(product):
+    """Product caption with the Buy Now button folded in as a link."""
+    message, _ = format_product_message(product)
+    return f"{message}\n\n🛒 <a href='{product.get('link')}'>Buy Now</a>"
+
+async def _reply_product_album(message_obj, products):
+    """Reply with several product photos as one media group."""
+    media = [
+        InputMediaPhoto(
+            media=product.get('photo_file_id') or product['image_url'],
+            caption=_album_caption(product),
+            parse_mode='HTML'
+        )
+        for product in products
+    ]
+    # Errors propagate: Telegram doesn't say which item it rejected, so the
+    # caller falls back to _reply_product_photo per product, which drops a
+    # stale file_id only for the product it belongs to
+    sent = await message_obj.reply_media_group(media=media)
+
+    for product, msg in zip(products, sent):
+        if msg.photo and msg.photo[-1].file_id != product.get('photo_file_id'):
+            await _remember_photo_file_id(product, msg.photo[-1].file_id)
+    return sent
+
+async def _reply_products(message_obj, products):
+    """Reply with several products: photos as albums of up to 10, the rest as text."""
+    with_photo = [p for p in products if p.get('image_url')]
+    
+    # Photos go out as albums of up to 10, one API call each
+    for start in range(0, len(with_photo), MEDIA_GROUP_SIZE):
+        batch = with_photo[start:start + MEDIA_GROUP_SIZE]
+        if len(batch) > 1:
+            try:
+                await _reply_product_album(message_obj, batch)
+                continue
+            except Exception as e:
+                # One bad image or caption fails the whole album; send the batch
+                # one by one so only that product is lost
+                logger.warning(f"Album failed, sending {len(batch)} photos individually: {e}")
+        
+        # A media group needs two items; a lone photo keeps its button
+        for product in batch:
+            try:
+                message, keyboard = format_product_message(product)
+                await _reply_product_photo(
+                    message_obj,
+                    product,
+                    caption=message,
+                    parse_mode='HTML',
+                    reply_markup=keyboard
+                )
+            except Exception as e:
+                logger.error(f"Error sending product photo: {e}")
+                continue
+    
+    for product in products:
+        if product.get('image_url'):
+            continue
+        try:
+            message, keyboard = format_product_message(product)
+            await message_obj.reply_text(
+                text=message,
+                parse_mode='HTML',
+                reply_markup=keyboard
+            )
+        except Exception as e:
+            logger.error(f"Error formatting product: {e}")
+            continue
+
+async def _remember_photo_file_id(product, file_id):
+    """Store (or clear) the Telegram file_id on the product and in MongoDB."""
+    if file_id:
+        product['photo_file_id'] = file_id
+    else:
+        product.pop('photo_file_id', None)
+    if product.get('_id'):
+        await asyncio.to_thread(db.set_product_photo_file_id, product['_id'], file_id)
+
+# Star strings by rounded rating, so rendering is a lookup
+_STARS = ["", "⭐", "⭐⭐", "⭐⭐⭐", "⭐⭐⭐⭐", "⭐⭐⭐⭐⭐"]
+
+def _render_product_message(product_data):
     """Format product data into a nice message with modern formatting."""
     if not product_data:
         return "Sorry, I couldn't fetch the product details. Please try again with a different link."
 
+    image_url = product_data.get('image_url')
+    title = product_data.get('title', 'Product Title Not Available')
+    price = product_data.get('price')
+    original_price = product_data.get('original_price')
+    discount = product_data.get('discount')
+    rating = product_data.get('rating')
+    reviews = product_data.get('reviews')
+    description = product_data.get('description')
+    features = product_data.get('features')
+
+    parts = []
+
     # Start with the product image if available
-    message = ""
-    if product_data.get('image_url'):
-        message += f"<a href='{product_data['image_url']}'>&#8205;</a>"
+    if image_url:
+        parts.append(f"<a href='{image_url}'>&#8205;</a>")
 
     # Add title with link
-    title = product_data.get('title', 'Product Title Not Available')
-    message += f"<b>🛍️ {title}</b>\n\n"
+    parts.append(f"<b>🛍️ {title}</b>\n\n")
 
     # Price section with original price and discount if available
     price_section = []
-    if product_data.get('price'):
-        current_price = f"<b>Price: {product_data['price']}</b>"
-        price_section.append(current_price)
-        
-        if product_data.get('original_price'):
-            original_price = f"M.R.P: {product_data['original_price']}"
-            price_section.append(original_price)
-            
-        if product_data.get('discount'):
-            discount = f"🏷️ <b>Save {product_data['discount']}</b>"
-            price_section.append(discount)
-    
-    message += "\n".join(price_section) + "\n\n"
+    if price:
+        price_section.append(f"<b>Price: {price}</b>")
+        if original_price:
+            price_section.append(f"M.R.P: {original_price}")
+        if discount:
+            price_section.append(f"🏷️ <b>Save {discount}</b>")
+    parts.append("\n".join(price_section))
+    parts.append("\n\n")
 
     # Rating and reviews section
-    if product_data.get('rating') or product_data.get('reviews'):
+    if rating or reviews:
         rating_section = []
-        if product_data.get('rating'):
-            stars = "⭐" * round(float(product_data['rating']))
-            rating_section.append(f"{stars} ({product_data['rating']})")
-        if product_data.get('reviews'):
-            rating_section.append(f"📊 {product_data['reviews']} reviews")
-        message += " | ".join(rating_section) + "\n\n"
+        if rating:
+            stars = _STARS[product_data.get('rating_stars', 0)]
+            rating_section.append(f"{stars} ({rating})")
+        if reviews:
+            rating_section.append(f"📊 {reviews} reviews")
+        parts.append(" | ".join(rating_section))
+        parts.append("\n\n")
 
     # Description or features
-    if product_data.get('description'):
-        message += f"📝 <i>{product_data['description'][:200]}...</i>\n\n"
-    elif product_data.get('features'):
-        message += "✨ <b>Highlights:</b>\n"
-        for feature in product_data['features'][:3]:
-            message += f"• {feature}\n"
-        message += "\n"
+    if description:
+        parts.append(f"📝 <i>{description[:200]}...</i>\n\n")
+    elif features:
+        parts.append("✨ <b>Highlights:</b>\n")
+        parts.extend(f"• {feature}\n" for feature in features[:3])
+        parts.append("\n")
 
     # Add Buy Now button using inline keyboard markup
     keyboard = InlineKeyboardMarkup([
         [InlineKeyboardButton("🛒 Buy Now", url=product_data.get('link'))]
     ])
 
-    return message, keyboard
+    return "".join(parts), keyboard
+
+# /deals keyboards, built on first use. The header depends on the category
+# list and is reset by _invalidate_header_keyboard() when categories change.
+_HEADER_KEYBOARD = None
+_FOOTER_KEYBOARD = None
+
+def _header_keyboard():
+    """Return the category keyboard shown above the deals."""
+    global _HEADER_KEYBOARD
+    if _HEADER_KEYBOARD is None:
+        category_buttons = []
+        row = []
+        for key in PRODUCTS.keys():
+            if len(row) == 2:  # Create rows of 2 buttons
+                category_buttons.append(row)
+                row = []
+            row.append(InlineKeyboardButton(f"📂 {DISPLAY_NAMES[key]}", callback_data=f"cat_{key}"))
+        if row:  # Add any remaining buttons
+            category_buttons.append(row)
+        _HEADER_KEYBOARD = InlineKeyboardMarkup(category_buttons)
+    return _HEADER_KEYBOARD
+
+def _invalidate_header_keyboard():
+    """Rebuild the category keyboard on next use."""
+    global _HEADER_KEYBOARD
+    _HEADER_KEYBOARD = None
+
+def _footer_keyboard(bot_username):
+    """Return the refresh/share keyboard shown below the deals."""
+    global _FOOTER_KEYBOARD
+    if _FOOTER_KEYBOARD is None:
+        _FOOTER_KEYBOARD = InlineKeyboardMarkup([
+            [
+                InlineKeyboardButton("🔄 Refresh Deals", callback_data="refresh_deals"),
+                InlineKeyboardButton("📱 Share Bot", url=f"https://t.me/share/url?url=Check%20out%20this%20amazing%20deals%20bot!&text=Join%20@{bot_username}")
+            ]
+        ])
+    return _FOOTER_KEYBOARD
+
+# Photo/text sends in flight per chat; replaces fixed sleeps
+CHAT_SEND_CONCURRENCY = 5
+
+# Tries per deal when Telegram answers with RetryAfter
+SEND_RETRIES = 3
+
+# Per-chat send semaphores, and locks so concurrent deal batches to a chat do
+# not interleave. Weak values drop a chat's entry once no handler holds it.
+_CHAT_SEND_SEMS = weakref.WeakValueDictionary()
+_CHAT_LOCKS = weakref.WeakValueDictionary()
+
+def _chat_lock(chat_id):
+    """Return the asyncio.Lock that serialises deal batches to a chat."""
+    lock = _CHAT_LOCKS.get(chat_id)
+    if lock is None:
+        lock = _CHAT_LOCKS[chat_id] = asyncio.Lock()
+    return lock
+
+def _chat_send_sem(chat_id):
+    """Return the semaphore capping concurrent sends to a chat."""
+    sem = _CHAT_SEND_SEMS.get(chat_id)
+    if sem is None:
+        sem = _CHAT_SEND_SEMS[chat_id] = asyncio.Semaphore(CHAT_SEND_CONCURRENCY)
+    return sem
+
+async def _send_deal(message_obj, product, category, current_time, with_more_button=False):
+    """Send one deal with its category/time footer and share buttons."""
+    try:
+        message, keyboard = format_product_message(product)
+        
+        # Add category tag and the handler's send time to message
+        message = f"{message}\n📂 Category: #{category}\n⏰ Updated: {current_time}"
+        
+        # Add additional buttons
+        new_row = [InlineKeyboardButton("📤 Share Deal", switch_inline_query=f"deal_{product.get('title', 'Amazing Deal')}")]
+        if with_more_button:
+            new_row.append(InlineKeyboardButton("🔍 More Deals", callback_data=f"more_{_category_key(category)}"))
+        
+        # Get existing keyboard buttons and add new ones
+        existing_buttons = keyboard.inline_keyboard[0] if keyboard.inline_keyboard else []
+        new_keyboard = InlineKeyboardMarkup([existing_buttons, new_row])
+        
+        sem = _chat_send_sem(message_obj.chat_id)
+        for attempt in range(SEND_RETRIES):
+            try:
+                async with sem:
+                    if product.get('image_url'):
+                        await _reply_product_photo(
+                            message_obj,
+                            product,
+                            caption=message,
+                            parse_mode='HTML',
+                            reply_markup=new_keyboard
+                        )
+                    else:
+                        await message_obj.reply_text(
+                            text=message,
+                            parse_mode='HTML',
+                            reply_markup=new_keyboard
+                        )
+                break
+            except RetryAfter as e:
+                # Large category browses can hit flood control; wait it out
+                logger.warning(f"Flood limit hit sending deal, retrying in {e.retry_after}s")
+                await asyncio.sleep(e.retry_after)
+        else:
+            logger.error(f"Giving up on deal {product.get('title')} after {SEND_RETRIES} attempts")
+    except Exception as e:
+        logger.error(f"Error sending product: {e}")
 
 async def send_deals(message_obj, context: ContextTypes.DEFAULT_TYPE):
     """Send deals to chat. Works with both regular messages and callback queries."""
     # Check if there are any products
-    total_products = sum(len(products) for products in PRODUCTS.values())
-    if total_products == 0:
+    if not ALL_PRODUCTS:
         await message_obj.reply_text("😔 No deals available at the moment. Please check back later!")
         return
 
-    # Send a nice header message with inline keyboard for categories
-    category_buttons = []
-    row = []
-    for category in PRODUCTS.keys():
-        if len(row) == 2:  # Create rows of 2 buttons
-            category_buttons.append(row)
-            row = []
-        row.append(InlineKeyboardButton(f"📂 {category}", callback_data=f"cat_{category.lower()}"))
-    if row:  # Add any remaining buttons
-        category_buttons.append(row)
-
-    header_keyboard = InlineKeyboardMarkup(category_buttons)
-    await message_obj.reply_text(
-        "🔥 *HOT DEALS OF THE DAY* 🔥\n\n"
-        "Check out these amazing offers! 🎉\n"
-        "Click on categories below to see more deals 👇",
-        parse_mode='Markdown',
-        reply_markup=header_keyboard
-    )
-    
-    # Get all available products
-    all_products = []
-    for category, products in PRODUCTS.items():
-        for product in products:
-            product['category'] = category  # Add category to product info
-            all_products.append(product)
-    
-    if not all_products:
-        return
-    
-    # Shuffle and select up to 5 random products
-    random.shuffle(all_products)
-    selected_products = all_products[:5]
-    
-    # Send products with delay to avoid rate limiting
-    for product in selected_products:
-        try:
-            message, keyboard = format_product_message(product)
-            
-            # Add category tag and time to message
-            current_time = datetime.now().strftime("%I:%M %p")
-            message = f"{message}\n📂 Category: #{product['category']}\n⏰ Updated: {current_time}"
-            
-            # Add additional buttons
-            share_button = InlineKeyboardButton("📤 Share Deal", switch_inline_query=f"deal_{product.get('title', 'Amazing Deal')}")
-            more_button = InlineKeyboardButton("🔍 More Deals", callback_data=f"more_{product['category'].lower()}")
-            
-            # Get existing keyboard buttons and add new ones
-            existing_buttons = keyboard.inline_keyboard[0] if keyboard.inline_keyboard else []
-            new_row = [share_button, more_button]
-            new_keyboard = InlineKeyboardMarkup([existing_buttons, new_row])
-            
-            if 'image_url' in product:
-                await message_obj.reply_photo(
-                    photo=product['image_url'],
-                    caption=message,
-                    parse_mode='HTML',
-                    reply_markup=new_keyboard
-                )
-            else:
-                await message_obj.reply_text(
-                    text=message,
-                    parse_mode='HTML',
-                    reply_markup=new_keyboard
-                )
-            
-            # Add small delay between messages
-            await asyncio.sleep(0.5)
-            
-        except Exception as e:
-            logger.error(f"Error formatting product: {e}")
-            continue
-    
-    # Send footer message
-    footer_buttons = [
-        [
-            InlineKeyboardButton("🔄 Refresh Deals", callback_data="refresh_deals"),
-            InlineKeyboardButton("📱 Share Bot", url=f"https://t.me/share/url?url=Check%20out%20this%20amazing%20deals%20bot!&text=Join%20@{context.bot.username}")
-        ]
-    ]
-    footer_keyboard = InlineKeyboardMarkup(footer_buttons)
-    
-    await message_obj.reply_text(
-        "🎯 *Want More Deals?*\n\n"
-        "• Use /category to browse by category\n"
-        "• Click Refresh Deals for new offers\n"
-        "• Share with friends to support us!\n\n"
-        "_Prices and offers may change. Please check final price before ordering._",
-        parse_mode='Markdown',
-        reply_markup=footer_keyboard
-    )
+    # Keep this chat's header, deals and footer together
+    async with _chat_lock(message_obj.chat_id):
+        # Send a nice header message with inline keyboard for categories
+        await message_obj.reply_text(
+            "🔥 *HOT DEALS OF THE DAY* 🔥\n\n"
+            "Check out these amazing offers! 🎉\n"
+            "Click on categories below to see more deals 👇",
+            parse_mode='Markdown',
+            reply_markup=_header_keyboard()
+        )
+        
+        # Select up to 5 random products and send them concurrently
+        selected_products = random.sample(ALL_PRODUCTS, min(5, len(ALL_PRODUCTS)))
+        current_time = datetime.now().strftime("%I:%M %p")
+        await asyncio.gather(*(
+            _send_deal(message_obj, product, product['category'], current_time, with_more_button=True)
+            for product in selected_products
+        ))
+        
+        # Send footer message
+        await message_obj.reply_text(
+            "🎯 *Want More Deals?*\n\n"
+            "• Use /category to browse by category\n"
+            "• Click Refresh Deals for new offers\n"
+            "• Share with friends to support us!\n\n"
+            "_Prices and offers may change. Please check final price before ordering._",
+            parse_mode='Markdown',
+            reply_markup=_footer_keyboard(context.bot.username)
+        )
 
 async def deals(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Send random product deals when /deals command is issued."""
@@ -474,7 +741,7 @@ async def deals(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def show_categories(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Show products by category."""
-    categories = list(PRODUCTS.keys())
+    categories = list(DISPLAY_NAMES.values())
     category_list = "\n".join([f"🔹 {cat}" for cat in categories])
     
     message = f"""📂 Available Categories:
@@ -486,32 +753,30 @@ To view products, use:
     
     await update.message.reply_text(message)
 
+def _command_category(text, bot_username):
+    """PRODUCTS key for a command like /electronics or /electronics@BotName.
+
+    Returns None for commands addressed to another bot, which CommandHandler
+    would also have ignored.
+    """
+    command, _, target = text.split()[0][1:].partition('@')
+    if target and target.lower() != (bot_username or '').lower():
+        return None
+    return command.lower()
+
+async def _dispatch_category(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Route any other /command to category_products if it names a category."""
+    if _command_category(update.message.text, context.bot.username) in PRODUCTS:
+        await category_products(update, context)
+
 async def category_products(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Show products from a specific category."""
-    category_name = update.message.text[1:].capitalize()  # Remove / and capitalize
+    key = _command_category(update.message.text, context.bot.username)
     
-    if category_name in PRODUCTS:
-        await update.message.reply_text(f"🔍 Showing products in {category_name}...")
+    if key in PRODUCTS:
+        await update.message.reply_text(f"🔍 Showing products in {DISPLAY_NAMES[key]}...")
         
-        for product in PRODUCTS[category_name]:
-            try:
-                message, keyboard = format_product_message(product)
-                if 'image_url' in product:
-                    await update.message.reply_photo(
-                        photo=product['image_url'],
-                        caption=message,
-                        parse_mode='HTML',
-                        reply_markup=keyboard
-                    )
-                else:
-                    await update.message.reply_text(
-                        text=message,
-                        parse_mode='HTML',
-                        reply_markup=keyboard
-                    )
-            except Exception as e:
-                logger.error(f"Error formatting product: {e}")
-                continue
+        await _reply_products(update.message, PRODUCTS[key])
     else:
         await update.message.reply_text("❌ Category not found. Use /category to see available categories.")
 
@@ -522,37 +787,16 @@ async def handle_button(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     if query.data.startswith("cat_"):
         # Handle category selection
-        category = query.data[4:].capitalize()
-        if category in PRODUCTS:
-            await query.message.reply_text(f"🔍 Showing deals from {category}...")
-            for product in PRODUCTS[category]:
-                try:
-                    message, keyboard = format_product_message(product)
-                    current_time = datetime.now().strftime("%I:%M %p")
-                    message = f"{message}\n📂 Category: #{category}\n⏰ Updated: {current_time}"
-                    
-                    # Add share button
-                    share_button = InlineKeyboardButton("📤 Share Deal", switch_inline_query=f"deal_{product.get('title', 'Amazing Deal')}")
-                    existing_buttons = keyboard.inline_keyboard[0] if keyboard.inline_keyboard else []
-                    new_keyboard = InlineKeyboardMarkup([existing_buttons, [share_button]])
-                    
-                    if 'image_url' in product:
-                        await query.message.reply_photo(
-                            photo=product['image_url'],
-                            caption=message,
-                            parse_mode='HTML',
-                            reply_markup=new_keyboard
-                        )
-                    else:
-                        await query.message.reply_text(
-                            text=message,
-                            parse_mode='HTML',
-                            reply_markup=new_keyboard
-                        )
-                    await asyncio.sleep(0.5)
-                except Exception as e:
-                    logger.error(f"Error sending product: {e}")
-                    continue
+        key = query.data[4:]
+        if key in PRODUCTS:
+            category = DISPLAY_NAMES[key]
+            async with _chat_lock(query.message.chat_id):
+                await query.message.reply_text(f"🔍 Showing deals from {category}...")
+                current_time = datetime.now().strftime("%I:%M %p")
+                await asyncio.gather(*(
+                    _send_deal(query.message, product, category, current_time)
+                    for product in PRODUCTS[key]
+                ))
 
     elif query.data == "refresh_deals":
         # Delete the original message and send new deals
@@ -566,149 +810,103 @@ async def handle_button(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     elif query.data.startswith("more_"):
         # Show more deals from the same category
-        category = query.data[5:].capitalize()
-        if category in PRODUCTS:
-            products = PRODUCTS[category]
-            random.shuffle(products)
-            await query.message.reply_text(f"📦 More deals from {category}:")
-            
-            for product in products[:3]:  # Show 3 more products
-                try:
-                    message, keyboard = format_product_message(product)
-                    current_time = datetime.now().strftime("%I:%M %p")
-                    message = f"{message}\n📂 Category: #{category}\n⏰ Updated: {current_time}"
-                    
-                    share_button = InlineKeyboardButton("📤 Share Deal", switch_inline_query=f"deal_{product.get('title', 'Amazing Deal')}")
-                    existing_buttons = keyboard.inline_keyboard[0] if keyboard.inline_keyboard else []
-                    new_keyboard = InlineKeyboardMarkup([existing_buttons, [share_button]])
-                    
-                    if 'image_url' in product:
-                        await query.message.reply_photo(
-                            photo=product['image_url'],
-                            caption=message,
-                            parse_mode='HTML',
-                            reply_markup=new_keyboard
-                        )
-                    else:
-                        await query.message.reply_text(
-                            text=message,
-                            parse_mode='HTML',
-                            reply_markup=new_keyboard
-                        )
-                    await asyncio.sleep(0.5)
-                except Exception as e:
-                    logger.error(f"Error sending product: {e}")
-                    continue
+        key = query.data[5:]
+        if key in PRODUCTS:
+            category = DISPLAY_NAMES[key]
+            products = PRODUCTS[key]
+            # Sample instead of shuffling so /list and /remove numbering stays stable
+            selected_products = random.sample(products, min(3, len(products)))  # Show 3 more products
+            async with _chat_lock(query.message.chat_id):
+                await query.message.reply_text(f"📦 More deals from {category}:")
+                current_time = datetime.now().strftime("%I:%M %p")
+                await asyncio.gather(*(
+                    _send_deal(query.message, product, category, current_time)
+                    for product in selected_products
+                ))
+
+def _render_inline_message(product, category):
+    """Render the Markdown text shared by a product inline result."""
+    price = product.get('price')
+    original_price = product.get('original_price')
+    discount = product.get('discount')
+    rating = product.get('rating')
+    reviews = product.get('reviews')
+
+    price_line = f"💰 *Price:* {price}\n" if price else ""
+    mrp_line = f"📌 *M.R.P:* ~{original_price}~\n" if original_price else ""
+    save_line = f"🏷️ *Save:* {discount}\n" if discount else ""
+    rating_part = f"\n{_STARS[product.get('rating_stars', 0)]} ({rating})" if rating else ""
+    reviews_part = f" | 📊 {reviews} reviews\n" if reviews else ""
+
+    return (
+        f"🔥 *{product.get('title', 'Amazing Deal')}*\n\n"
+        f"{price_line}{mrp_line}{save_line}{rating_part}{reviews_part}"
+        f"\n🛒 *Buy Now:* {product.get('link')}\n\n"
+        f"📂 Category: #{category}"
+    )
+
+# Inline Buy Now / More Deals keyboard per product _id, pruned with _FMT_CACHE
+# on reload. The More Deals link embeds the bot username, so a rename resets it.
+_INLINE_KB_CACHE = {}
+_INLINE_KB_USERNAME = None
+
+def _inline_keyboard(product, bot_username):
+    """Return the cached share keyboard for an inline result."""
+    global _INLINE_KB_USERNAME
+    if bot_username != _INLINE_KB_USERNAME:
+        _INLINE_KB_CACHE.clear()
+        _INLINE_KB_USERNAME = bot_username
+    product_id = product.get('_id')
+    keyboard = _INLINE_KB_CACHE.get(product_id)
+    if keyboard is None:
+        keyboard = InlineKeyboardMarkup([[
+            InlineKeyboardButton("🛒 Buy Now", url=product.get('link')),
+            InlineKeyboardButton("🤖 More Deals", url=f"https://t.me/{bot_username}")
+        ]])
+        if product_id:
+            _INLINE_KB_CACHE[product_id] = keyboard
+    return keyboard
+
+def _inline_result(result_id, product, category, bot_username):
+    """Build the shareable inline article for a product."""
+    return InlineQueryResultArticle(
+        id=result_id,
+        title=product.get('title', 'Amazing Deal'),
+        description=f"💰 {product.get('price', 'Check price')} | 📂 {category}",
+        thumb_url=product.get('image_url') or None,
+        input_message_content=InputTextMessageContent(
+            message_text=_render_inline_message(product, category),
+            parse_mode='Markdown'
+        ),
+        reply_markup=_inline_keyboard(product, bot_username)
+    )
 
 async def inline_query(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle inline queries for sharing deals."""
     query = update.inline_query.query
+    results = []
     
     if not query:  # If no specific query, show random deals
-        results = []
-        all_products = []
-        
-        # Collect all products
-        for category, products in PRODUCTS.items():
-            for product in products:
-                product['category'] = category
-                all_products.append(product)
-        
-        # Shuffle and select up to 5 products
-        random.shuffle(all_products)
-        selected_products = all_products[:5]
+        # Select up to 5 random products
+        selected_products = random.sample(ALL_PRODUCTS, min(5, len(ALL_PRODUCTS)))
         
         for idx, product in enumerate(selected_products):
-            # Create message text
-            message_text = f"🔥 *{product.get('title', 'Amazing Deal')}*\n\n"
-            
-            if product.get('price'):
-                message_text += f"💰 *Price:* {product['price']}\n"
-            if product.get('original_price'):
-                message_text += f"📌 *M.R.P:* ~{product['original_price']}~\n"
-            if product.get('discount'):
-                message_text += f"🏷️ *Save:* {product['discount']}\n"
-            if product.get('rating'):
-                stars = "⭐" * round(float(product['rating']))
-                message_text += f"\n{stars} ({product['rating']})"
-            if product.get('reviews'):
-                message_text += f" | 📊 {product['reviews']} reviews\n"
-            
-            message_text += f"\n🛒 *Buy Now:* {product.get('link')}\n\n"
-            message_text += f"📂 Category: #{product['category']}"
-            
-            results.append(
-                InlineQueryResultArticle(
-                    id=str(idx),
-                    title=product.get('title', 'Amazing Deal'),
-                    description=f"💰 {product.get('price', 'Check price')} | 📂 {product['category']}",
-                    thumb_url=product.get('image_url') if product.get('image_url') else None,
-                    input_message_content=InputTextMessageContent(
-                        message_text=message_text,
-                        parse_mode='Markdown'
-                    ),
-                    reply_markup=InlineKeyboardMarkup([[
-                        InlineKeyboardButton("🛒 Buy Now", url=product.get('link')),
-                        InlineKeyboardButton("🤖 More Deals", url=f"https://t.me/{context.bot.username}")
-                    ]])
-                )
-            )
-    else:  # Search for specific product
-        # Extract deal identifier if it starts with "deal_"
-        if query.startswith("deal_"):
-            product_title = query[5:]  # Remove "deal_" prefix
-            results = []
-            
-            # Search for the product
-            for category, products in PRODUCTS.items():
-                for product in products:
-                    if product.get('title', '').lower() == product_title.lower():
-                        message_text = f"🔥 *{product.get('title', 'Amazing Deal')}*\n\n"
-                        
-                        if product.get('price'):
-                            message_text += f"💰 *Price:* {product['price']}\n"
-                        if product.get('original_price'):
-                            message_text += f"📌 *M.R.P:* ~{product['original_price']}~\n"
-                        if product.get('discount'):
-                            message_text += f"🏷️ *Save:* {product['discount']}\n"
-                        if product.get('rating'):
-                            stars = "⭐" * round(float(product['rating']))
-                            message_text += f"\n{stars} ({product['rating']})"
-                        if product.get('reviews'):
-                            message_text += f" | 📊 {product['reviews']} reviews\n"
-                        
-                        message_text += f"\n🛒 *Buy Now:* {product.get('link')}\n\n"
-                        message_text += f"📂 Category: #{category}"
-                        
-                        results.append(
-                            InlineQueryResultArticle(
-                                id='1',
-                                title=product.get('title', 'Amazing Deal'),
-                                description=f"💰 {product.get('price', 'Check price')} | 📂 {category}",
-                                thumb_url=product.get('image_url') if product.get('image_url') else None,
-                                input_message_content=InputTextMessageContent(
-                                    message_text=message_text,
-                                    parse_mode='Markdown'
-                                ),
-                                reply_markup=InlineKeyboardMarkup([[
-                                    InlineKeyboardButton("🛒 Buy Now", url=product.get('link')),
-                                    InlineKeyboardButton("🤖 More Deals", url=f"https://t.me/{context.bot.username}")
-                                ]])
-                            )
-                        )
-                        break
-                if results:
-                    break
+            results.append(_inline_result(str(idx), product, product['category'], context.bot.username))
+    elif query.startswith("deal_"):  # Search for specific product
+        product_title = query[5:]  # Remove "deal_" prefix
+        
+        # One normalised dict lookup replaces scanning every category
+        hit = TITLE_INDEX.get(_title_key(product_title))
+        if hit:
+            category, product = hit
+            results.append(_inline_result('1', product, category, context.bot.username))
     
     await update.inline_query.answer(results, cache_time=1)
 
 async def ping_service(context: ContextTypes.DEFAULT_TYPE):
     """Periodic task to keep the bot alive and check database connection."""
     try:
-        # Get the chat ID from environment variable or use a default admin ID
-        ping_chat_id = int(os.getenv('PING_CHAT_ID', ADMIN_IDS[0] if ADMIN_IDS else None))
-        
-        if not ping_chat_id:
+        if not PING_CHAT_ID:
             logger.warning("No ping chat ID configured. Ping service will run silently.")
             return
 
@@ -729,7 +927,7 @@ async def ping_service(context: ContextTypes.DEFAULT_TYPE):
         # Get bot statistics
         stats = {
             "uptime": datetime.now() - context.bot_data.get("start_time", datetime.now()),
-            "products": sum(len(products) for products in PRODUCTS.values()),
+            "products": len(ALL_PRODUCTS),
             "categories": len(PRODUCTS),
             **db.get_user_stats()
         }
@@ -746,41 +944,167 @@ async def ping_service(context: ContextTypes.DEFAULT_TYPE):
             f"🔄 Last Check: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
         )
 
-        # Send status message silently (without notification)
-        await context.bot.send_message(
-            chat_id=ping_chat_id,
+        # Queue status message silently (without notification)
+        await sender.enqueue(
+            chat_id=PING_CHAT_ID,
             text=status_message,
             parse_mode='Markdown',
             disable_notification=True
         )
 
         # Reload products from database periodically
-        load_products_from_db()
+        await load_products_from_db()
         
         logger.info("Ping service completed successfully")
     except Exception as e:
         logger.error(f"Error in ping service: {e}")
 
-# Create web app for health check
+# Broadcasts go out in chunks of BROADCAST_CHUNK messages, one chunk per
+# BROADCAST_INTERVAL seconds, through TelegramSender's global budget so they
+# and other outgoing messages stay under Telegram's 30 messages/s together
+BROADCAST_CHUNK = 25
+BROADCAST_INTERVAL = 1.0
+
+# Tries per broadcast message that hits flood limits, within one send
+BROADCAST_RETRIES = 3
+
+# A message that fails with a network error is retried after
+# BROADCAST_RETRY_DELAY seconds, and dropped after BROADCAST_MAX_ATTEMPTS tries
+BROADCAST_RETRY_DELAY = 60
+BROADCAST_MAX_ATTEMPTS = 5
+
+# Seconds between checks for broadcasts left queued by a restart, outage or retry
+BROADCAST_RESUME_INTERVAL = 60
+
+# Only one task drains the pending broadcast queue at a time
+_BROADCAST_LOCK = asyncio.Lock()
+
+# Messages delivered so far per running broadcast id. Every drain works the
+# shared queue, so it credits each delivery to the broadcast it belongs to.
+_BROADCAST_SENT = {}
+
+async def _broadcast_one(item):
+    """Send one queued broadcast message.
+
+    Returns True if sent, False if it can never be delivered and None if it
+    should stay queued for another try.
+    """
+    for _ in range(BROADCAST_RETRIES):
+        try:
+            await sender.send(chat_id=item['chat_id'], text=item['text'])
+            return True
+        except RetryAfter as e:
+            logger.warning(f"Flood limit hit during broadcast, pausing {e.retry_after}s")
+            await asyncio.sleep(e.retry_after)
+        except (Forbidden, BadRequest) as e:
+            # Blocked the bot, deleted account, etc.; retrying won't help
+            logger.error(f"Dropping broadcast to {item['chat_id']}: {e}")
+            return False
+        except Exception as e:
+            # Timeouts and network errors are transient; the drain retries later
+            logger.warning(f"Error broadcasting to {item['chat_id']}: {e}")
+            return None
+    return None
+
+async def _drain_broadcasts():
+    """Deliver everything in the pending broadcast queue; returns how many were sent.
+
+    Deliveries are also credited to their broadcast in _BROADCAST_SENT.
+    """
+    sent = 0
+    async with _BROADCAST_LOCK:
+        while True:
+            pending = await asyncio.to_thread(db.get_pending_broadcasts, BROADCAST_CHUNK)
+            if not pending:
+                break
+            results = await asyncio.gather(*(_broadcast_one(item) for item in pending))
+            sent += results.count(True)
+            for item, result in zip(pending, results):
+                broadcast_id = item.get('broadcast_id')
+                if result and broadcast_id in _BROADCAST_SENT:
+                    _BROADCAST_SENT[broadcast_id] += 1
+            done = [item['_id'] for item, result in zip(pending, results) if result is not None]
+            
+            # Failed messages go behind the untried ones instead of leading every
+            # chunk, and are given up on after BROADCAST_MAX_ATTEMPTS tries
+            failed = [item for item, result in zip(pending, results) if result is None]
+            expired = [item['_id'] for item in failed if item.get('attempts', 0) + 1 >= BROADCAST_MAX_ATTEMPTS]
+            deferred = [item['_id'] for item in failed if item.get('attempts', 0) + 1 < BROADCAST_MAX_ATTEMPTS]
+            if expired:
+                logger.error(f"Dropping {len(expired)} broadcast messages after {BROADCAST_MAX_ATTEMPTS} attempts")
+            if not await asyncio.to_thread(db.remove_pending_broadcasts, done + expired):
+                # Stop rather than resend the same chunk; the next resume retries it
+                break
+            if not await asyncio.to_thread(db.defer_broadcasts, deferred, BROADCAST_RETRY_DELAY):
+                break
+            if not done:
+                # Nothing in the chunk got through, so Telegram is unreachable;
+                # leave the queue to the next resume instead of spinning
+                logger.warning("Broadcast paused: no messages could be delivered")
+                break
+            await asyncio.sleep(BROADCAST_INTERVAL)
+    return sent
+
+async def broadcast(chat_ids, text):
+    """Send text to every chat in chat_ids; returns how many were delivered.
+
+    Messages are queued in MongoDB first, so a restart mid-broadcast
+    resumes where it stopped instead of losing the rest. The queue is
+    read and written from worker threads to keep the event loop free.
+    """
+    broadcast_id = await asyncio.to_thread(db.queue_broadcast, chat_ids, text)
+    if broadcast_id is None:
+        return 0
+    _BROADCAST_SENT[broadcast_id] = 0
+    try:
+        # Waits behind any drain already running, which may deliver ours too
+        await _drain_broadcasts()
+        return _BROADCAST_SENT[broadcast_id]
+    finally:
+        del _BROADCAST_SENT[broadcast_id]
+
+async def _broadcast_and_report(message_obj, chat_ids, text):
+    """Run a broadcast and tell the admin how it went."""
+    try:
+        sent = await broadcast(chat_ids, text)
+        await message_obj.reply_text(f"✅ Broadcast delivered to {sent} of {len(chat_ids)} users.")
+    except Exception as e:
+        logger.error(f"Error broadcasting: {e}")
+
+async def resume_broadcasts(context: ContextTypes.DEFAULT_TYPE):
+    """Finish any broadcast interrupted by a restart or a Telegram outage."""
+    sent = await _drain_broadcasts()
+    if sent:
+        logger.info(f"Resumed broadcast: {sent} messages delivered")
+
+async def broadcast_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Send a message to every user."""
+    if not is_admin(update.effective_user.id):
+        await update.message.reply_text("❌ This command is only for admins.")
+        return
+
+    # Everything after the command, keeping the admin's line breaks
+    parts = update.message.text.split(None, 1)
+    text = parts[1].strip() if len(parts) > 1 else ''
+    if not text:
+        await update.message.reply_text("❌ Please provide a message.\nExample: /broadcast New deals are live!")
+        return
+
+    chat_ids = await asyncio.to_thread(db.get_user_chat_ids)
+    if not chat_ids:
+        await update.message.reply_text("No users to broadcast to.")
+        return
+
+    # Delivery takes minutes for a large audience; run it outside the update so
+    # the webhook answers now and Telegram doesn't re-deliver the command
+    context.application.create_task(_broadcast_and_report(update.message, chat_ids, text))
+    await update.message.reply_text(f"📣 Broadcasting to {len(chat_ids)} users...")
+
+# Health check endpoint served next to the webhook in production
 async def health_check(request):
     """Health check endpoint for Render."""
     return web.Response(text='Bot is running!')
 
-async def web_app():
-    """Create web app for health check."""
-    app = web.Application()
-    app.router.add_get('/', health_check)
-    return app
-
-async def start_web_app():
-    """Start the web application."""
-    app = await web_app()
-    runner = web.AppRunner(app)
-    await runner.setup()
-    site = web.TCPSite(runner, '0.0.0.0', PORT)
-    await site.start()
-    logger.info(f"Web app started on port {PORT}")
-
 async def category_add(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Add a new category."""
     if not is_admin(update.effective_user.id):
@@ -791,17 +1115,22 @@ async def category_add(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("❌ Please provide a category name.\nExample: /category_add Electronics")
         return
 
-    category = context.args[0].capitalize()
+    key = _category_key(context.args[0])
+    category = _display_name(key)
     try:
         # Check if category already exists
-        if category in PRODUCTS:
+        if key in PRODUCTS:
             await update.message.reply_text(f"❌ Category '{category}' already exists!")
             return
 
         # Add category to database
         if db.add_category(category):
             # Initialize empty product list for new category
-            PRODUCTS[category] = []
+            _catalogue_changed()
+            PRODUCTS[key] = []
+            DISPLAY_NAMES[key] = category
+            _invalidate_header_keyboard()
+            _invalidate_categories_cache()
             await update.message.reply_text(f"✅ Category '{category}' added successfully!")
         else:
             await update.message.reply_text("❌ Failed to add category. Please try again.")
@@ -820,15 +1149,16 @@ async def category_remove(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("❌ Please provide a category name.\nExample: /category_remove Electronics")
         return
 
-    category = context.args[0].capitalize()
+    key = _category_key(context.args[0])
+    category = _display_name(key)
     try:
         # Check if category exists
-        if category not in PRODUCTS:
+        if key not in PRODUCTS:
             await update.message.reply_text(f"❌ Category '{category}' does not exist!")
             return
 
         # Get number of products in category
-        num_products = len(PRODUCTS[category])
+        num_products = len(PRODUCTS[key])
 
         # Check if this is a confirmation command
         is_confirmation = len(context.args) > 1 and context.args[1].lower() == 'confirm'
@@ -845,7 +1175,16 @@ async def category_remove(update: Update, context: ContextTypes.DEFAULT_TYPE):
         # Proceed with removal (either empty category or confirmed)
         if db.remove_category(category):
             # Remove category from memory
-            del PRODUCTS[category]
+            _catalogue_changed()
+            removed = PRODUCTS.pop(key)
+            del DISPLAY_NAMES[key]
+            _invalidate_header_keyboard()
+            _invalidate_categories_cache()
+            ALL_PRODUCTS[:] = [p for p in ALL_PRODUCTS if p.get('category') != category]
+            for product in removed:
+                _FMT_CACHE.pop(product['_id'], None)
+                _INLINE_KB_CACHE.pop(product['_id'], None)
+            _unindex_titles(removed)
             if num_products > 0:
                 await update.message.reply_text(
                     f"✅ Category '{category}' and its {num_products} products have been removed successfully!"
@@ -854,7 +1193,7 @@ async def category_remove(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 await update.message.reply_text(f"✅ Category '{category}' removed successfully!")
             
             # Reload products from database to ensure sync
-            load_products_from_db()
+            await load_products_from_db()
         else:
             await update.message.reply_text("❌ Failed to remove category. Please try again.")
 
@@ -865,19 +1204,23 @@ async def category_remove(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def main():
     """Start the bot."""
     try:
-        # Load products from database at startup
-        load_products_from_db()
+        # Load products from database at startup, alongside the bot setup
+        initial_load = asyncio.create_task(load_products_from_db())
         
-        # Create the Application
+        # Create the Application. Bot API calls share one keep-alive pool sized
+        # for concurrent handlers; getUpdates long-polls on its own connection.
         application = (
             Application.builder()
             .token(os.getenv('TELEGRAM_BOT_TOKEN'))
+            .request(HTTPXRequest(connection_pool_size=TELEGRAM_POOL_SIZE))
+            .get_updates_request(HTTPXRequest(connection_pool_size=1))
             .concurrent_updates(True)
             .build()
         )
 
         # Store start time
         application.bot_data["start_time"] = datetime.now()
+        sender.attach(application.bot)
 
         # Add command handlers
         application.add_handler(CommandHandler("start", start))
@@ -891,10 +1234,11 @@ async def main():
         application.add_handler(CommandHandler("remove", remove_product))
         application.add_handler(CommandHandler("category_add", category_add))
         application.add_handler(CommandHandler("category_remove", category_remove))
+        application.add_handler(CommandHandler("broadcast", broadcast_command))
         
-        # Add category handlers
-        for category in PRODUCTS.keys():
-            application.add_handler(CommandHandler(category.lower(), category_products))
+        # Category commands share one handler that looks the name up in PRODUCTS,
+        # so categories added at runtime work without registering new handlers
+        application.add_handler(MessageHandler(filters.UpdateType.MESSAGE & filters.COMMAND, _dispatch_category))
 
         # Add callback query handler
         application.add_handler(CallbackQueryHandler(handle_button))
@@ -907,6 +1251,7 @@ async def main():
         if job_queue:
             job_queue.run_repeating(ping_service, interval=50, first=10)
             logger.info("Ping service scheduled successfully (running every 50 seconds)")
+            job_queue.run_repeating(resume_broadcasts, interval=BROADCAST_RESUME_INTERVAL, first=15)
         else:
             logger.warning("Job queue is not available. Ping service will not run.")
 
@@ -936,6 +1281,20 @@ async def main():
             # Add webhook route
             app.router.add_post('/webhook', handle_webhook)
             
+            # run_app closes the event loop when it exits, so the bot has to be
+            # stopped from the app's own cleanup, while the loop still runs
+            async def stop_bot(app):
+                try:
+                    await application.bot.delete_webhook()
+                    await application.stop()
+                    await sender.close()
+                    await application.shutdown()
+                    await close_client()
+                except Exception as e:
+                    logger.error(f"Error during cleanup: {e}")
+            
+            app.on_cleanup.append(stop_bot)
+            
             # Initialize the application
             await application.initialize()
             
@@ -944,14 +1303,18 @@ async def main():
             await application.bot.delete_webhook()  # Delete any existing webhook
             await application.bot.set_webhook(
                 url=webhook_url,
-                allowed_updates=Update.ALL_TYPES
+                allowed_updates=Update.ALL_TYPES,
+                max_connections=WEBHOOK_MAX_CONNECTIONS
             )
             logger.info(f"Webhook set to {webhook_url}")
             
+            # Finish the catalogue load before handing over to the web server
+            await initial_load
             return app, application
         else:
             # Development mode (local)
             logger.info("Starting bot in development mode...")
+            await initial_load
             return None, application
 
     except Exception as e:
@@ -987,7 +1350,10 @@ def run_development():
         try:
             # Cleanup
             loop.run_until_complete(application.stop())
+            loop.run_until_complete(sender.close())
             loop.run_until_complete(application.shutdown())
+            loop.run_until_complete(close_client())
+            close_parse_pool()
             loop.close()
             db.close()
         except Exception as e:
@@ -1005,8 +1371,17 @@ def run_production():
         # Start the application
         loop.run_until_complete(application.start())
         
-        # Run the web app
-        web.run_app(web_app, host='0.0.0.0', port=PORT, access_log=None)
+        # Serve the web app on the loop the bot and job queue already run on.
+        # Keep-alive outlasts Render's health-check interval so probes reuse
+        # their connection.
+        web.run_app(
+            web_app,
+            host='0.0.0.0',
+            port=PORT,
+            access_log=None,
+            keepalive_timeout=WEB_KEEPALIVE_TIMEOUT,
+            loop=loop
+        )
     except KeyboardInterrupt:
         logger.info("Bot stopped by user")
     except Exception as e:
@@ -1014,11 +1389,10 @@ def run_production():
         raise
     finally:
         try:
-            # Cleanup
-            loop.run_until_complete(application.bot.delete_webhook())
-            loop.run_until_complete(application.stop())
-            loop.run_until_complete(application.shutdown())
-            loop.close()
+            # Cleanup (the bot itself is stopped by the web app's cleanup hook)
+            close_parse_pool()
+            if not loop.is_closed():
+                loop.close()
             db.close()
         except Exception as e:
             logger.error(f"Error during cleanup: {e}")
@@ -1,17 +1,27 @@
-import requests
+import asyncio
+import os
 from bs4 import BeautifulSoup
 import re
 import json
 import logging
 import random
 import time
+import weakref
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from urllib.parse import urlparse, parse_qs, urljoin
+from cachetools import TTLCache
+from aiolimiter import AsyncLimiter
 from fake_useragent import UserAgent
 import cloudscraper
+import httpx
+from requests.adapters import HTTPAdapter
+from lxml import etree, html as lxml_html
 
 logger = logging.getLogger(__name__)
 
-# Initialize cloudscraper
+# Initialize cloudscraper, kept as a fallback for pages that block plain HTTP clients
 scraper = cloudscraper.create_scraper(
     browser={
         'browser': 'chrome',
@@ -20,50 +30,305 @@ scraper = cloudscraper.create_scraper(
     }
 )
 
+# Keep the session's sockets warm across scrapes. The https adapter reuses the
+# SSL context cloudscraper configured, so its browser-like TLS setup stays.
+scraper.mount('https://', cloudscraper.CipherSuiteAdapter(
+    ssl_context=scraper.adapters['https://'].ssl_context,
+    pool_connections=10,
+    pool_maxsize=20,
+    max_retries=0
+))
+scraper.mount('http://', HTTPAdapter(pool_connections=10, pool_maxsize=20, max_retries=0))
+
+# Patterns used on every scrape, compiled once
+_ASIN_PATH = re.compile(r'/dp/([A-Z0-9]{10})')
+_PRICE_CLEAN = re.compile(r'[^\d.]')
+_RATING = re.compile(r'(\d+\.?\d*)')
+_REVIEWS = re.compile(r'(\d+(?:,\d+)*)')
+_IMG_SIZE = re.compile(r'_(SY|SX)\d+_')
+
+def _cls(name):
+    """XPath predicate matching a CSS class, like `.name` in a selector."""
+    return f'contains(concat(" ", normalize-space(@class), " "), " {name} ")'
+
+def _xpaths(*expressions):
+    """Compile XPath expressions, keeping the given priority order."""
+    return [etree.XPath(expression) for expression in expressions]
+
+class _Field:
+    """Fallback selectors for one field, matched in a single pass over the tree.
+
+    Each selector is an XPath predicate on the element itself. One
+    //*[p1 or p2 ...] query finds every candidate, then the candidates are
+    sorted into selectors by priority, so results match trying each
+    selector in turn.
+    """
+
+    def __init__(self, *predicates):
+        self._all = etree.XPath('//*[' + ' or '.join(f'({p})' for p in predicates) + ']')
+        self._selectors = [etree.XPath(f'boolean(self::*[{p}])') for p in predicates]
+
+    def groups(self, tree):
+        """Yield each selector's matches in document order, best selector first."""
+        candidates = self._all(tree)
+        for selector in self._selectors:
+            matched = [elem for elem in candidates if selector(elem)]
+            if matched:
+                yield matched
+
+# Product page fields, each one query per page
+_TITLE_FIELD = _Field(
+    '@id="productTitle"',
+    f'self::h1 and {_cls("product-title")}',
+    'self::h1 and @data-test-id="product-title"',
+    _cls("product-title-word-break"),
+)
+_PRICE_FIELD = _Field(
+    f'{_cls("a-offscreen")} and ancestor::*[{_cls("a-price")}]',
+    '@id="priceblock_ourprice"',
+    '@id="priceblock_dealprice"',
+    _cls("a-price-whole"),
+    _cls("a-color-price"),
+)
+_ORIGINAL_PRICE_FIELD = _Field(
+    _cls("a-text-strike"),
+    '@id="priceblock_listprice"',
+    f'self::span and @aria-hidden="true" and ancestor::*[{_cls("a-price")} and {_cls("a-text-price")}]',
+    _cls("a-text-price"),
+)
+_RATING_FIELD = _Field(
+    'self::span and @data-hook="rating-out-of-text"',
+    f'{_cls("a-icon-alt")} and ancestor::*[{_cls("a-icon-star")}]',
+    f'{_cls("a-color-base")} and ancestor::*[@id="acrPopover"]',
+)
+_REVIEWS_FIELD = _Field(
+    '@id="acrCustomerReviewText"',
+    'self::span and @data-hook="total-review-count"',
+    f'{_cls("a-color-secondary")} and ancestor::*[@id="reviewsMedley"]',
+)
+_DESCRIPTION_FIELD = _Field(
+    f'{_cls("a-list-item")} and ancestor::*[@id="feature-bullets"]',
+    'self::p and ancestor::*[@id="productDescription"]',
+    '@id="product-description"',
+    f'{_cls("a-spacing-mini")} and not({_cls("a-spacing-top-small")})',
+)
+_FEATURES_FIELD = _Field(
+    f'{_cls("a-list-item")} and ancestor::*[@id="feature-bullets"]',
+    f'{_cls("a-list-item")} and ancestor::*[{_cls("a-unordered-list")}]',
+)
+
+# Image candidates, tried in order of preference
+# The main image's hi-res URL, present on most product pages
+# (Amazon often sends it empty, so blank values don't count)
+_XP_IMAGE_HIRES = etree.XPath('//img[@id="imgBlkFront" or @id="landingImage"]/@data-old-hires[normalize-space()]')
+
+# Fallback image selectors when the main image has no data-old-hires
+_XP_IMAGE = _xpaths(
+    '//*[@id="imgBlkFront"]',
+    '//*[@id="landingImage"]',
+    '//*[@id="main-image"]',
+    f'//*[{_cls("a-dynamic-image")}]',
+    '//*[@id="imgTagWrapperId"]//img',
+    f'//*[{_cls("image-wrapper")}]//img',
+    f'//*[{_cls("a-stretch-horizontal")}]//img',
+    '//img[@data-old-hires]',
+    '//img[@data-a-dynamic-image]',
+)
+
+def _text(elem):
+    """Stripped text content of an element."""
+    return elem.text_content().strip()
+
+# Retry policy for product pages: total budget per lookup, backoff base,
+# and statuses that won't change however often they are retried
+DEADLINE_S = 20
+RETRY_BASE_DELAY = 2
+_NON_RETRYABLE_STATUSES = (400, 404, 410)
+
+# Product pages are a few hundred KB; anything past this is an error page or junk
+MAX_PAGE_BYTES = 2_000_000
+
+_CHARSET = re.compile(r'charset=["\']?([\w-]+)', re.IGNORECASE)
+
+# A fetched page: raw body bytes plus the charset its Content-Type declared (or None)
+_Page = namedtuple('_Page', 'status_code headers content encoding')
+
+class _PageTooLarge(Exception):
+    """The response body exceeded MAX_PAGE_BYTES."""
+
+# Recent lookups: short link -> expanded URL, ASIN -> scraped product
+_URL_CACHE = TTLCache(maxsize=5000, ttl=86400)
+_PRODUCT_CACHE = TTLCache(maxsize=2000, ttl=900)
+
+# One lock per cache key while it is being filled, so concurrent requests for
+# the same link wait for one fetch instead of all fetching. Entries vanish
+# once no coroutine holds the lock.
+_KEY_LOCKS = weakref.WeakValueDictionary()
+
+def _key_lock(key):
+    """Return the asyncio.Lock guarding a cache key."""
+    lock = _KEY_LOCKS.get(key)
+    if lock is None:
+        lock = _KEY_LOCKS[key] = asyncio.Lock()
+    return lock
+
+# Requests to Amazon per second across all scrapes; how many may be in flight
+# at once comes from SCRAPE_CONCURRENCY
+AMAZON_MAX_RATE = 2
+_SCRAPE_SEM = None
+_AMAZON_BUCKET = None
+
+def _amazon_limits():
+    """Return the (semaphore, rate limiter) pair every Amazon request goes through."""
+    global _SCRAPE_SEM, _AMAZON_BUCKET
+    # Built on first use because main.py loads .env after importing this module
+    if _SCRAPE_SEM is None:
+        _SCRAPE_SEM = asyncio.Semaphore(int(os.getenv('SCRAPE_CONCURRENCY', 4)))
+        _AMAZON_BUCKET = AsyncLimiter(AMAZON_MAX_RATE, 1)
+    return _SCRAPE_SEM, _AMAZON_BUCKET
+
+# Product page fetches closer together than this get a short, jittered pause
+MIN_SCRAPE_GAP = 2.0
+_LAST_AMAZON_HIT = 0.0
+
+# Worker processes that parse product pages, so lxml work runs in parallel
+# and never holds the GIL the event loop needs
+_PARSE_POOL = None
+
+def _parse_pool():
+    """Return the page-parsing process pool, starting it on first use."""
+    global _PARSE_POOL
+    if _PARSE_POOL is None:
+        # Platform default start method: on Linux the workers fork from the bot
+        # and never re-run main.py; they only ever call parse_product_page.
+        # Each worker is a full copy of the bot process, and os.cpu_count()
+        # reports host CPUs rather than the container's share, so the pool
+        # size comes from PARSE_WORKERS instead
+        _PARSE_POOL = ProcessPoolExecutor(max_workers=max(1, int(os.getenv('PARSE_WORKERS', 2))))
+    return _PARSE_POOL
+
+def close_parse_pool():
+    """Shut down the parsing worker processes."""
+    global _PARSE_POOL
+    if _PARSE_POOL is not None:
+        _PARSE_POOL.shutdown(cancel_futures=True)
+        _PARSE_POOL = None
+
+def _discard_broken_pool(pool):
+    """Drop pool after a worker died, unless another scrape already replaced it."""
+    global _PARSE_POOL
+    # Several scrapes can see the same BrokenProcessPool; only the first may
+    # reset, or a later one would shut down the fresh pool under a retry
+    if _PARSE_POOL is pool:
+        _PARSE_POOL = None
+        # Its workers are gone, so there is nothing to wait for
+        pool.shutdown(wait=False, cancel_futures=True)
+
+# Connection pool shared by concurrent scrapes
+HTTP_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10)
+HTTP_TIMEOUT = 15
+
+# Total budget for one cloudscraper fallback; a challenge round trip can take
+# a few requests, each bounded by HTTP_TIMEOUT
+FALLBACK_TIMEOUT = 2 * HTTP_TIMEOUT
+
+# Shared async client, created on first use so it binds to the bot's event loop
+_client = None
+
+def get_client():
+    """Return the shared keep-alive HTTP client."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT, follow_redirects=True)
+    return _client
+
+async def close_client():
+    """Close the shared HTTP client and its pooled connections."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+# Built once: UserAgent() parses its bundled data (and may hit the network)
+try:
+    _UA = UserAgent()
+except Exception:
+    _UA = None
+
+# Used when fake_useragent is unavailable
+_FALLBACK_UAS = (
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/92.0.4515.159 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+)
+
+# Browser-like headers; only the User-Agent changes per request
+_HEADERS_TEMPLATE = {
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+    'Accept-Encoding': 'gzip, deflate',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
+    'Cache-Control': 'max-age=0',
+    'dnt': '1',
+    'sec-ch-ua': '"Google Chrome";v="119", "Chromium";v="119", "Not?A_Brand";v="24"',
+    'sec-ch-ua-mobile': '?0',
+    'sec-ch-ua-platform': '"Windows"',
+    'sec-fetch-dest': 'document',
+    'sec-fetch-mode': 'navigate',
+    'sec-fetch-site': 'none',
+    'sec-fetch-user': '?1',
+}
+
 def get_headers():
     """Get random headers to avoid detection."""
-    try:
-        ua = UserAgent()
-        user_agent = ua.random
-    except:
-        user_agent = random.choice([
-            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/92.0.4515.159 Safari/537.36',
-            'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-        ])
-
-    return {
-        'User-Agent': user_agent,
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-        'Accept-Language': 'en-US,en;q=0.5',
-        'Accept-Encoding': 'gzip, deflate, br',
-        'Connection': 'keep-alive',
-        'Upgrade-Insecure-Requests': '1',
-        'Cache-Control': 'max-age=0',
-        'dnt': '1',
-        'sec-ch-ua': '"Google Chrome";v="119", "Chromium";v="119", "Not?A_Brand";v="24"',
-        'sec-ch-ua-mobile': '?0',
-        'sec-ch-ua-platform': '"Windows"',
-        'sec-fetch-dest': 'document',
-        'sec-fetch-mode': 'navigate',
-        'sec-fetch-site': 'none',
-        'sec-fetch-user': '?1',
-    }
+    user_agent = None
+    if _UA is not None:
+        try:
+            user_agent = _UA.random
+        except Exception:
+            pass
+    headers = dict(_HEADERS_TEMPLATE)
+    headers['User-Agent'] = user_agent or random.choice(_FALLBACK_UAS)
+    return headers
+
+async def expand_shortened_url(url):
+    """Expand shortened Amazon URL to full URL, reusing recent expansions."""
+    async with _key_lock(('url', url)):
+        expanded_url = _URL_CACHE.get(url)
+        if expanded_url is None:
+            expanded_url = await _resolve_short_url(url)
+            # Failures hand back the input; only cache real expansions
+            if expanded_url != url:
+                _URL_CACHE[url] = expanded_url
+    return expanded_url
+
+async def resolve_url(url):
+    """Return url with any amzn.to short link expanded.
+
+    Callers that need the expanded URL in several steps resolve it once
+    and pass it on as expanded=.
+    """
+    if 'amzn.to' in url:
+        return await expand_shortened_url(url)
+    return url
 
-def expand_shortened_url(url):
-    """Expand shortened Amazon URL to full URL."""
+async def _resolve_short_url(url):
+    """Follow a short link's redirects (and campaign pages) to the product URL."""
     try:
-        # Create a session with cloudscraper
-        session = scraper.create_scraper()
+        client = get_client()
+        semaphore, bucket = _amazon_limits()
         
         # First try to get the final URL
-        response = session.head(url, allow_redirects=True)
-        expanded_url = response.url
+        async with semaphore, bucket:
+            response = await client.head(url, headers=get_headers())
+        expanded_url = str(response.url)
         
         # If we got a mission/campaign page, try to extract the actual product URL
         if 'mission' in expanded_url or 'campaign' in expanded_url:
             # Get the full page content
-            response = session.get(url)
+            async with semaphore, bucket:
+                response = await client.get(url, headers=get_headers())
             soup = BeautifulSoup(response.text, 'lxml')
             
             # Try to find product link
@@ -98,36 +363,41 @@ def expand_shortened_url(url):
         logger.error(f"Error expanding URL: {e}")
         return url
 
-def extract_asin(url):
+async def extract_asin(url, *, expanded=None):
     """Extract ASIN from Amazon URL."""
     try:
         # First expand the URL if it's shortened
-        if 'amzn.to' in url:
-            url = expand_shortened_url(url)
-            logger.info(f"Working with expanded URL: {url}")
+        if expanded is None:
+            expanded = await resolve_url(url)
+            if expanded != url:
+                logger.info(f"Working with expanded URL: {expanded}")
         
-        # Try to find ASIN in URL path
-        path_match = re.search(r'/dp/([A-Z0-9]{10})', url)
-        if path_match:
-            return path_match.group(1)
-        
-        # Try to find ASIN in query parameters
-        parsed_url = urlparse(url)
-        query_params = parse_qs(parsed_url.query)
-        
-        if 'asin' in query_params:
-            return query_params['asin'][0]
-        
-        return None
+        return _asin_from_url(expanded)
     except Exception as e:
         logger.error(f"Error extracting ASIN: {e}")
         return None
 
+def _asin_from_url(url):
+    """ASIN from an expanded Amazon URL's path or query, or None."""
+    # Try to find ASIN in URL path
+    path_match = _ASIN_PATH.search(url)
+    if path_match:
+        return path_match.group(1)
+    
+    # Try to find ASIN in query parameters
+    parsed_url = urlparse(url)
+    query_params = parse_qs(parsed_url.query)
+    
+    if 'asin' in query_params:
+        return query_params['asin'][0]
+    
+    return None
+
 def clean_price(price_str):
     """Clean price string to standard format."""
     if not price_str:
         return None
-    price = re.sub(r'[^\d.]', '', price_str)
+    price = _PRICE_CLEAN.sub('', price_str)
     return f"₹{price}"
 
 def extract_discount(current_price, original_price):
@@ -136,8 +406,8 @@ def extract_discount(current_price, original_price):
         return None
     
     try:
-        current = float(re.sub(r'[^\d.]', '', current_price))
-        original = float(re.sub(r'[^\d.]', '', original_price))
+        current = float(_PRICE_CLEAN.sub('', current_price))
+        original = float(_PRICE_CLEAN.sub('', original_price))
         if original > 0:
             discount = ((original - current) / original) * 100
             return f"{int(discount)}%"
@@ -145,15 +415,236 @@ def extract_discount(current_price, original_price):
         pass
     return None
 
-def get_product_details(url, max_retries=3):
-    """Fetch product details from Amazon URL."""
+def _charset(headers):
+    """Charset declared in a Content-Type header, or None."""
+    match = _CHARSET.search(headers.get('Content-Type', ''))
+    return match.group(1) if match else None
+
+def _check_size(size):
+    """Raise _PageTooLarge once a body grows past MAX_PAGE_BYTES."""
+    if size > MAX_PAGE_BYTES:
+        raise _PageTooLarge(f"Page is over {MAX_PAGE_BYTES} bytes")
+
+def _cloudscraper_get(url):
+    """Fetch url with cloudscraper. Blocking, so callers run it in a worker thread."""
+    # cloudscraper reads the whole body to detect challenges, so the size
+    # check can only happen afterwards here
+    response = scraper.get(url, timeout=HTTP_TIMEOUT)
+    if response.status_code in (403, 503):
+        # Still challenged: start the next attempt without the stale clearance cookies
+        scraper.cookies.clear()
+    _check_size(len(response.content))
+    return _Page(response.status_code, response.headers, response.content, _charset(response.headers))
+
+async def _fetch_page(url):
+    """Fetch a product page as bytes, giving up on bodies over MAX_PAGE_BYTES."""
+    semaphore, bucket = _amazon_limits()
+    async with semaphore, bucket:
+        async with get_client().stream('GET', url, headers=get_headers()) as response:
+            status_code = response.status_code
+            if status_code == 200:
+                declared = response.headers.get('Content-Length', '')
+                if declared.isdigit():
+                    _check_size(int(declared))
+                # Stream so an oversized body is dropped before it is all in memory
+                chunks = []
+                size = 0
+                async for chunk in response.aiter_bytes():
+                    size += len(chunk)
+                    _check_size(size)
+                    chunks.append(chunk)
+                return _Page(status_code, response.headers, b''.join(chunks), _charset(response.headers))
+            if status_code in _NON_RETRYABLE_STATUSES or status_code == 429:
+                return _Page(status_code, response.headers, b'', None)
+    
+    # Anti-bot challenges can still pass with cloudscraper; keep it off the event loop
+    logger.info(f"Direct fetch returned {status_code}, retrying with cloudscraper")
+    # Bounded so a hung connection can't hold a scrape slot forever; the
+    # thread itself finishes once requests' own timeout fires
+    async with semaphore, bucket:
+        return await asyncio.wait_for(asyncio.to_thread(_cloudscraper_get, url), FALLBACK_TIMEOUT)
+
+def _retry_after(page):
+    """Seconds to wait from a Retry-After header, defaulting to 1."""
+    try:
+        return max(0.0, float(page.headers.get('Retry-After', 1)))
+    except (TypeError, ValueError):
+        # HTTP-date form; not worth parsing for a short wait
+        return 1.0
+
+def _sized_image(image_url):
+    """Swap Amazon's low-resolution size markers in an image URL for 500px."""
+    if '_SL160_' in image_url:
+        return image_url.replace('_SL160_', '_SL500_')
+    if '_SY' in image_url or '_SX' in image_url:
+        return _IMG_SIZE.sub('_SL500_', image_url)
+    return image_url
+
+def _probe_image(tree):
+    """Try every fallback image selector and attribute; return the first URL found."""
+    for xpath in _XP_IMAGE:
+        for image_elem in xpath(tree):
+            # Try different image attributes in order of preference, skipping blank ones
+            hires = image_elem.get('data-old-hires', '').strip()
+            if hires:
+                return _sized_image(hires)
+            if 'data-a-dynamic-image' in image_elem.attrib:
+                try:
+                    # JSON of URL -> [width, height]; take the widest
+                    image_data = json.loads(image_elem.get('data-a-dynamic-image'))
+                    if image_data:
+                        return max(image_data, key=lambda k: image_data[k][0] if isinstance(image_data[k], list) else 0)
+                except:
+                    pass
+            src = image_elem.get('src', '').strip()
+            if src:
+                return _sized_image(src)
+    return None
+
+def parse_product_page(content, url, encoding=None):
+    """Extract product details from a product page. Raises if essential data is missing.
+
+    content is the raw body; lxml decodes it in C using encoding when the
+    server declared one, or the page's own <meta charset> otherwise.
+    """
+    # One lxml tree; every lookup below is a precompiled XPath over it
+    parser = lxml_html.HTMLParser(encoding=encoding) if encoding else None
+    tree = lxml_html.fromstring(content, parser=parser)
+    
+    # Debug log for title element
+    title_elem = next(_TITLE_FIELD.groups(tree), [None])[0]
+    
+    logger.info(f"Title element found: {title_elem is not None}")
+    
+    # Extract product details with logging
+    title = _text(title_elem) if title_elem is not None else None
+    logger.info(f"Extracted title: {title}")
+
+    if not title:
+        raise Exception("Failed to extract product title")
+
+    # Try multiple price selectors with logging
+    price = None
+    for price_elems in _PRICE_FIELD.groups(tree):
+        price = _text(price_elems[0])
+        logger.info(f"Found price: {price}")
+        break
+
+    # Get original price
+    original_price = None
+    for original_price_elems in _ORIGINAL_PRICE_FIELD.groups(tree):
+        original_price = _text(original_price_elems[0])
+        logger.info(f"Found original price: {original_price}")
+        break
+
+    # Get rating
+    rating = None
+    for rating_elems in _RATING_FIELD.groups(tree):
+        rating_match = _RATING.search(_text(rating_elems[0]))
+        if rating_match:
+            rating = rating_match.group(1)
+            logger.info(f"Found rating: {rating}")
+            break
+
+    # Get reviews count
+    reviews = None
+    for reviews_elems in _REVIEWS_FIELD.groups(tree):
+        reviews_match = _REVIEWS.search(_text(reviews_elems[0]))
+        if reviews_match:
+            reviews = reviews_match.group(1)
+            logger.info(f"Found reviews: {reviews}")
+            break
+
+    # Get description and features
+    description = None
+    features = []
+    
+    # Try to get description
+    for desc_elems in _DESCRIPTION_FIELD.groups(tree):
+        description = ' '.join([_text(elem) for elem in desc_elems[:2]])
+        logger.info(f"Found description: {description[:100]}...")
+        break
+
+    # Get features
+    for feature_elems in _FEATURES_FIELD.groups(tree):
+        for elem in feature_elems[:4]:
+            feature_text = _text(elem)
+            if feature_text and len(feature_text) > 5:
+                features.append(feature_text)
+        if features:
+            logger.info(f"Found {len(features)} features")
+            break
+
+    # Get product image, straight from the main image when it has a hi-res URL
+    hires = _XP_IMAGE_HIRES(tree)
+    image_url = _sized_image(hires[0].strip()) if hires else _probe_image(tree)
+    if image_url:
+        # Ensure absolute URL and HTTPS
+        image_url = urljoin(url, image_url)
+        if image_url.startswith('http://'):
+            image_url = 'https://' + image_url[7:]
+        logger.info(f"Found image URL: {image_url}")
+
+    # Clean and format the data
+    price = clean_price(price) if price else None
+    original_price = clean_price(original_price) if original_price else None
+    discount = extract_discount(price, original_price) if price and original_price else None
+
+    # Create product data dictionary
+    product_data = {
+        'title': title,
+        'price': price,
+        'original_price': original_price,
+        'discount': discount,
+        'rating': rating,
+        'reviews': reviews,
+        'description': description,
+        'features': features,
+        # Senders treat a present image_url as a photo, so never store an empty one
+        'image_url': image_url or None,
+        'link': url
+    }
+
+    # Filter out None values
+    product_data = {k: v for k, v in product_data.items() if v is not None}
+    
+    # Validate essential fields
+    if not product_data.get('title') or not product_data.get('price'):
+        raise Exception("Missing essential product data (title or price)")
+    
+    return product_data
+
+async def get_product_details(url, max_retries=3, *, expanded=None):
+    """Fetch product details from Amazon URL, reusing recent results per ASIN."""
+    url = expanded if expanded is not None else await resolve_url(url)
+    
+    # The same product behind different links or tags shares one cache entry
+    asin = _asin_from_url(url)
+    if not asin:
+        return await _scrape_product(url, max_retries)
+    
+    async with _key_lock(('product', asin)):
+        product_data = _PRODUCT_CACHE.get(asin)
+        if product_data is None:
+            product_data = await _scrape_product(url, max_retries)
+            if product_data is None:
+                return None
+            _PRODUCT_CACHE[asin] = product_data
+    # Callers add their own fields (category, _id), so never hand out the cached dict
+    return dict(product_data)
+
+async def _scrape_product(url, max_retries):
+    """Scrape a product page, retrying transient failures within DEADLINE_S."""
+    global _LAST_AMAZON_HIT
     last_error = None
+    start = time.monotonic()
     
     for attempt in range(max_retries):
+        delay = None
         try:
             # Expand shortened URL if necessary
             if 'amzn.to' in url:
-                url = expand_shortened_url(url)
+                url = await expand_shortened_url(url)
                 logger.info(f"Expanded URL for scraping (attempt {attempt + 1}): {url}")
 
             # Add affiliate tag if not present
@@ -161,246 +652,71 @@ def get_product_details(url, max_retries=3):
                 separator = '&' if '?' in url else '?'
                 url = f"{url}{separator}tag=krunalweb20-21"
 
-            # Add some randomized delay to appear more human-like
-            time.sleep(random.uniform(2, 4))
+            # Only pause when the last product page fetch was recent, so
+            # bursts look human-paced but a cold request goes out immediately
+            wait = MIN_SCRAPE_GAP - (time.monotonic() - _LAST_AMAZON_HIT)
+            if wait > 0:
+                await asyncio.sleep(wait + random.random())
+            _LAST_AMAZON_HIT = time.monotonic()
 
-            # Create a new scraper session for each attempt
-            session = scraper.create_scraper()
+            page = await _fetch_page(url)
+            status_code = page.status_code
+            logger.info(f"Response status code: {status_code}")
             
-            # Make the request using cloudscraper
-            response = session.get(url)
-            logger.info(f"Response status code: {response.status_code}")
-            
-            if response.status_code != 200:
-                raise Exception(f"Failed to fetch page. Status code: {response.status_code}")
+            if status_code in _NON_RETRYABLE_STATUSES:
+                # Dead or malformed link; retrying only burns the budget
+                logger.error(f"Product page returned {status_code}, not retrying: {url}")
+                return None
+            if status_code == 429:
+                delay = _retry_after(page)
+            if status_code != 200:
+                raise Exception(f"Failed to fetch page. Status code: {status_code}")
 
-            # Parse the content
-            soup = BeautifulSoup(response.text, 'lxml')
-            
-            # Debug log for title element
-            title_elem = soup.select_one('#productTitle')
-            if not title_elem:
-                # Try alternative title selectors
-                title_elem = (
-                    soup.select_one('h1.product-title') or
-                    soup.select_one('h1[data-test-id="product-title"]') or
-                    soup.select_one('.product-title-word-break')
+            # Parsing is CPU-bound, so it runs in a worker process
+            pool = _parse_pool()
+            try:
+                product_data = await asyncio.get_running_loop().run_in_executor(
+                    pool, parse_product_page, page.content, url, page.encoding
                 )
-            
-            logger.info(f"Title element found: {title_elem is not None}")
-            
-            # Extract product details with logging
-            title = title_elem.text.strip() if title_elem else None
-            logger.info(f"Extracted title: {title}")
-
-            if not title:
-                raise Exception("Failed to extract product title")
-
-            # Try multiple price selectors with logging
-            price = None
-            price_selectors = [
-                '.a-price .a-offscreen',
-                '#priceblock_ourprice',
-                '#priceblock_dealprice',
-                '.a-price-whole',
-                '.a-color-price'
-            ]
-            
-            for selector in price_selectors:
-                price_elem = soup.select_one(selector)
-                if price_elem:
-                    price = price_elem.text.strip()
-                    logger.info(f"Found price with selector {selector}: {price}")
-                    break
-
-            # Get original price
-            original_price = None
-            original_price_selectors = [
-                '.a-text-strike',
-                '#priceblock_listprice',
-                '.a-price.a-text-price span[aria-hidden="true"]',
-                '.a-text-price'
-            ]
-            
-            for selector in original_price_selectors:
-                original_price_elem = soup.select_one(selector)
-                if original_price_elem:
-                    original_price = original_price_elem.text.strip()
-                    logger.info(f"Found original price: {original_price}")
-                    break
-
-            # Get rating
-            rating = None
-            rating_selectors = [
-                'span[data-hook="rating-out-of-text"]',
-                '.a-icon-star .a-icon-alt',
-                '#acrPopover .a-color-base'
-            ]
-            
-            for selector in rating_selectors:
-                rating_elem = soup.select_one(selector)
-                if rating_elem:
-                    rating_text = rating_elem.text.strip()
-                    rating_match = re.search(r'(\d+\.?\d*)', rating_text)
-                    if rating_match:
-                        rating = rating_match.group(1)
-                        logger.info(f"Found rating: {rating}")
-                        break
-
-            # Get reviews count
-            reviews = None
-            reviews_selectors = [
-                '#acrCustomerReviewText',
-                'span[data-hook="total-review-count"]',
-                '#reviewsMedley .a-color-secondary'
-            ]
-            
-            for selector in reviews_selectors:
-                reviews_elem = soup.select_one(selector)
-                if reviews_elem:
-                    reviews_text = reviews_elem.text.strip()
-                    reviews_match = re.search(r'(\d+(?:,\d+)*)', reviews_text)
-                    if reviews_match:
-                        reviews = reviews_match.group(1)
-                        logger.info(f"Found reviews: {reviews}")
-                        break
-
-            # Get description and features
-            description = None
-            features = []
-            
-            # Try to get description
-            description_selectors = [
-                '#feature-bullets .a-list-item',
-                '#productDescription p',
-                '#product-description',
-                '.a-spacing-mini:not(.a-spacing-top-small)'
-            ]
-            
-            for selector in description_selectors:
-                desc_elems = soup.select(selector)
-                if desc_elems:
-                    description = ' '.join([elem.text.strip() for elem in desc_elems[:2]])
-                    logger.info(f"Found description: {description[:100]}...")
-                    break
-
-            # Get features
-            feature_selectors = [
-                '#feature-bullets .a-list-item',
-                '.a-unordered-list .a-list-item'
-            ]
-            
-            for selector in feature_selectors:
-                feature_elems = soup.select(selector)
-                for elem in feature_elems[:4]:
-                    feature_text = elem.text.strip()
-                    if feature_text and len(feature_text) > 5:
-                        features.append(feature_text)
-                if features:
-                    logger.info(f"Found {len(features)} features")
-                    break
-
-            # Get product image
-            image_url = None
-            image_selectors = [
-                '#imgBlkFront',
-                '#landingImage',
-                '#main-image',
-                '.a-dynamic-image',
-                '#imgTagWrapperId img',
-                '.image-wrapper img',
-                '.a-stretch-horizontal img',
-                'img[data-old-hires]',
-                'img[data-a-dynamic-image]'
-            ]
-            
-            for selector in image_selectors:
-                image_elems = soup.select(selector)
-                for image_elem in image_elems:
-                    # Try different image attributes in order of preference
-                    for attr in ['data-old-hires', 'data-a-dynamic-image', 'src']:
-                        if attr in image_elem.attrs:
-                            if attr == 'data-a-dynamic-image':
-                                try:
-                                    # Parse the JSON string to get the highest resolution image
-                                    image_data = json.loads(image_elem[attr])
-                                    if image_data:
-                                        # Get the URL with the highest resolution
-                                        image_url = max(image_data.items(), key=lambda x: x[1][0] if isinstance(x[1], list) else 0)[0]
-                                        break
-                                except:
-                                    continue
-                            else:
-                                image_url = image_elem[attr]
-                                # Remove low-quality indicators
-                                if '_SL160_' in image_url:
-                                    image_url = image_url.replace('_SL160_', '_SL500_')
-                                elif '_SY' in image_url or '_SX' in image_url:
-                                    # Replace with higher resolution
-                                    image_url = re.sub(r'_(SY|SX)\d+_', '_SL500_', image_url)
-                                break
-                    
-                    if image_url:
-                        # Ensure absolute URL and HTTPS
-                        image_url = urljoin(url, image_url)
-                        if image_url.startswith('http://'):
-                            image_url = 'https://' + image_url[7:]
-                        logger.info(f"Found image URL: {image_url}")
-                        break
-                
-                if image_url:
-                    break
-
-            # Clean and format the data
-            price = clean_price(price) if price else None
-            original_price = clean_price(original_price) if original_price else None
-            discount = extract_discount(price, original_price) if price and original_price else None
-
-            # Create product data dictionary
-            product_data = {
-                'title': title,
-                'price': price,
-                'original_price': original_price,
-                'discount': discount,
-                'rating': rating,
-                'reviews': reviews,
-                'description': description,
-                'features': features,
-                'image_url': image_url,
-                'link': url
-            }
-
-            # Filter out None values
-            product_data = {k: v for k, v in product_data.items() if v is not None}
-            
-            # Validate essential fields
-            if not product_data.get('title') or not product_data.get('price'):
-                raise Exception("Missing essential product data (title or price)")
+            except BrokenProcessPool:
+                # A worker died; start a fresh pool for the next attempt
+                _discard_broken_pool(pool)
+                raise
             
             logger.info(f"Successfully extracted product data: {json.dumps(product_data, indent=2)}")
             return product_data
 
+        except _PageTooLarge as e:
+            # The same URL will serve the same oversized page next time
+            logger.error(f"{e}, not retrying: {url}")
+            return None
         except Exception as e:
             last_error = str(e)
             logger.warning(f"Attempt {attempt + 1} failed: {last_error}")
             
-            # Add increasing delay between retries
+            # Exponential backoff with jitter (or the server's Retry-After),
+            # as long as it fits in what is left of the deadline
             if attempt < max_retries - 1:
-                time.sleep(random.uniform(3 * (attempt + 1), 6 * (attempt + 1)))
+                if delay is None:
+                    delay = RETRY_BASE_DELAY * 2 ** attempt + random.random()
+                remaining = DEADLINE_S - (time.monotonic() - start)
+                if delay >= remaining:
+                    logger.warning(f"Retry budget of {DEADLINE_S}s exhausted")
+                    break
+                await asyncio.sleep(delay)
     
-    logger.error(f"All {max_retries} attempts failed. Last error: {last_error}")
+    logger.error(f"Giving up after {attempt + 1} attempts. Last error: {last_error}")
     return None
 
-def is_valid_amazon_url(url):
+async def is_valid_amazon_url(url, *, expanded=None):
     """Check if URL is a valid Amazon product URL."""
     try:
         # Handle shortened URLs
-        if 'amzn.to' in url:
-            expanded_url = expand_shortened_url(url)
-            logger.info(f"Validating expanded URL: {expanded_url}")
-            parsed_url = urlparse(expanded_url)
-        else:
-            parsed_url = urlparse(url)
+        if expanded is None:
+            expanded = await resolve_url(url)
+        if expanded != url:
+            logger.info(f"Validating expanded URL: {expanded}")
+        parsed_url = urlparse(expanded)
             
         is_valid = (
             ('amazon.in' in parsed_url.netloc or 'amzn.to' in parsed_url.netloc) and
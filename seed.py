@@ -0,0 +1,84 @@
+from dotenv import load_dotenv
+from database import Database
+
+# Load environment variables
+load_dotenv()
+
+# Sample products with affiliate links
+SAMPLE_PRODUCTS = {
+    'Electronics': [
+        {
+            'title': 'boAt Airdopes 141 Bluetooth TWS Earbuds',
+            'price': '₹1,299',
+            'original_price': '₹4,499',
+            'discount': '71%',
+            'rating': '4.1',
+            'reviews': '12,543',
+            'description': '42H playtime, ENx™ Technology, ASAP™ Charge, IWP™ Technology, 8mm drivers',
+            'features': [
+                'Up to 42 Hours Total Playback',
+                'ENx™ Technology for Clear Calls',
+                'ASAP™ Charge - 10 mins = 75 mins',
+                'IPX4 Water Resistance'
+            ],
+            'image_url': 'https://m.media-amazon.com/images/I/61KNJav3S9L._SX522_.jpg',
+            'link': 'https://amzn.to/yourlink1'  # Replace with your actual affiliate link
+        },
+        {
+            'title': 'OnePlus Nord Buds 2',
+            'price': '₹2,999',
+            'original_price': '₹3,999',
+            'discount': '25%',
+            'rating': '4.2',
+            'reviews': '8,876',
+            'description': 'Active Noise Cancellation, Spatial Audio, 12.4mm drivers, Up to 36hrs battery',
+            'features': [
+                'Up to 36 Hours Battery Life',
+                'Active Noise Cancellation up to 25db',
+                'IP55 Dust and Water Resistance',
+                'Super Fast Charging'
+            ],
+            'image_url': 'https://m.media-amazon.com/images/I/51oxrEYhYQL._SL1500_.jpg',
+            'link': 'https://amzn.to/yourlink2'  # Replace with your actual affiliate link
+        }
+    ],
+    'Fashion': [
+        {
+            'title': 'Allen Solly Men Regular Fit Shirt',
+            'price': '₹799',
+            'original_price': '₹1,599',
+            'discount': '50%',
+            'rating': '4.0',
+            'reviews': '2,345',
+            'description': 'Regular Fit Cotton Shirt, Perfect for Office Wear',
+            'features': [
+                '100% Premium Cotton',
+                'Regular Collar',
+                'Machine Wash',
+                'Perfect for Formal & Casual Wear'
+            ],
+            'image_url': 'https://m.media-amazon.com/images/I/61N6Ls3K8iL._UY679_.jpg',
+            'link': 'https://amzn.to/yourlink3'  # Replace with your actual affiliate link
+        }
+    ],
+    'Home': [
+        {
+            'title': 'Wipro Smart LED Bulb',
+            'price': '₹499',
+            'rating': '4.3',
+            'link': 'https://www.amazon.in/dp/B07PYJJ898?tag=krunalweb20-21'
+        }
+    ]
+}
+
+def seed():
+    """Insert the sample products into MongoDB for local development."""
+    db = Database()
+    for category, products in SAMPLE_PRODUCTS.items():
+        for product in products:
+            stored = db.add_product(dict(product), category)
+            status = "Added" if stored else "Failed to add"
+            print(f"{status}: [{category}] {product['title']}")
+
+if __name__ == "__main__":
+    seed()
@@ -0,0 +1,113 @@
+import asyncio
+import logging
+import weakref
+from telegram.error import RetryAfter
+
+logger = logging.getLogger(__name__)
+
+# Telegram allows about 30 messages/s overall and 1 message/s per chat
+GLOBAL_INTERVAL = 1 / 28
+PER_CHAT_INTERVAL = 1.0
+
+# Attempts per message when Telegram answers with RetryAfter
+MAX_RETRIES = 3
+
+class TelegramSender:
+    """Queue outbound messages and send them within Telegram's rate limits."""
+
+    def __init__(self):
+        self._bot = None
+        self._queue = None
+        self._worker = None
+        self._deliveries = set()
+        # Per-chat locks, dropped once no delivery to the chat holds one
+        self._chat_locks = weakref.WeakValueDictionary()
+        self._global_lock = None
+        self._global_next = 0.0
+
+    def attach(self, bot):
+        """Set the bot used for sending. The worker starts on the first enqueue."""
+        self._bot = bot
+
+    async def enqueue(self, **message):
+        """Queue a send_message call without waiting for it to be delivered."""
+        if self._bot is None:
+            raise RuntimeError("TelegramSender.attach() must be called before enqueue()")
+        if self._worker is None or self._worker.done():
+            # Created here so everything binds to the loop that serves updates
+            if self._queue is None:
+                self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+        await self._queue.put(message)
+
+    async def send(self, **message):
+        """Send a message right away within the global budget, raising any error.
+
+        For callers that handle failures themselves (broadcasts); they still
+        share the global rate with queued messages.
+        """
+        if self._bot is None:
+            raise RuntimeError("TelegramSender.attach() must be called before send()")
+        await self._wait_global_slot()
+        return await self._bot.send_message(**message)
+
+    async def close(self):
+        """Stop the worker and drop anything still queued."""
+        tasks = list(self._deliveries)
+        if self._worker is not None:
+            tasks.append(self._worker)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._worker = None
+        self._deliveries.clear()
+
+    async def _run(self):
+        """Hand queued messages to per-chat deliveries in arrival order."""
+        while True:
+            message = await self._queue.get()
+            task = asyncio.create_task(self._deliver(message))
+            self._deliveries.add(task)
+            task.add_done_callback(self._deliveries.discard)
+            self._queue.task_done()
+
+    def _chat_lock(self, chat_id):
+        """Return the asyncio.Lock that orders and spaces messages to a chat."""
+        lock = self._chat_locks.get(chat_id)
+        if lock is None:
+            lock = self._chat_locks[chat_id] = asyncio.Lock()
+        return lock
+
+    async def _deliver(self, message):
+        """Send one message once both the chat and the global budget allow it."""
+        chat_id = message.get('chat_id')
+        # The chat lock is FIFO, so messages to one chat keep their order
+        async with self._chat_lock(chat_id):
+            for attempt in range(MAX_RETRIES):
+                await self._wait_global_slot()
+                try:
+                    await self._bot.send_message(**message)
+                    break
+                except RetryAfter as e:
+                    logger.warning(f"Flood limit hit for chat {chat_id}, retrying in {e.retry_after}s")
+                    await asyncio.sleep(e.retry_after)
+                except Exception as e:
+                    logger.error(f"Error sending message to {chat_id}: {e}")
+                    break
+            else:
+                logger.error(f"Giving up on message to {chat_id} after {MAX_RETRIES} attempts")
+
+            # Hold the lock through the chat's interval: the next message waits
+            # for it, and an idle chat leaves nothing behind once it passes
+            await asyncio.sleep(PER_CHAT_INTERVAL)
+
+    async def _wait_global_slot(self):
+        """Wait until the next message fits in the global budget, then claim it."""
+        if self._global_lock is None:
+            self._global_lock = asyncio.Lock()
+        loop = asyncio.get_running_loop()
+        async with self._global_lock:
+            wait = self._global_next - loop.time()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._global_next = loop.time() + GLOBAL_INTERVAL
@@ -1,5 +1,6 @@
 import requests
 import os
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -16,6 +17,7 @@ def set_webhook():
     # Request data
     data = {
         "url": webhook_url,
+        "max_connections": 100,
         "allowed_updates": [
             "message",
             "edited_message",
@@ -34,13 +36,17 @@ def set_webhook():
         ]
     }
     
-    # Send request
-    response = requests.post(url, json=data)
-    print(f"Response: {response.json()}")
-    
-    # Check current webhook info
-    info_response = requests.get(f"https://api.telegram.org/bot{bot_token}/getWebhookInfo")
-    print(f"\nWebhook Info: {info_response.json()}")
+    # One pooled connection, so the second call reuses the first call's TLS session
+    with requests.Session() as session:
+        session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        
+        # Send request
+        response = session.post(url, json=data)
+        print(f"Response: {response.json()}")
+        
+        # Check current webhook info
+        info_response = session.get(f"https://api.telegram.org/bot{bot_token}/getWebhookInfo")
+        print(f"\nWebhook Info: {info_response.json()}")
 
 if __name__ == "__main__":
     set_webhook() 